@@ -0,0 +1,78 @@
+"""
+Compara a latência por etapa de uma consulta ao assistente OpenAI (file_search):
+
+- polling: threads.create + messages.create + runs.create_and_poll + messages.list (fluxo antigo)
+- streaming: threads.create_and_run_stream, lendo o texto à medida que é gerado (fluxo atual)
+
+Requer OPENAI_API_KEY e um assistente com o Vector Store já associado.
+
+Uso:
+    python benchmarks/assistant_run.py ASSISTANT_ID [--query TEXTO] [--runs N] [--poll-interval MS]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, "package"))
+
+from openai import OpenAI
+
+def polled(client, assistant_id, query, poll_interval_ms):
+    timings = {}
+    started = time.perf_counter()
+    thread = client.beta.threads.create()
+    timings["thread"] = time.perf_counter() - started
+    client.beta.threads.messages.create(thread_id=thread.id, role="user", content=query)
+    timings["mensagem"] = time.perf_counter() - started
+    run = client.beta.threads.runs.create_and_poll(
+        thread_id=thread.id,
+        assistant_id=assistant_id,
+        poll_interval_ms=poll_interval_ms,
+    )
+    timings["run"] = time.perf_counter() - started
+    messages = list(client.beta.threads.messages.list(thread_id=thread.id, run_id=run.id))
+    timings["primeiro_token"] = timings["resposta"] = time.perf_counter() - started
+    return timings, messages[0].content[0].text.value if messages else ""
+
+def streamed(client, assistant_id, query):
+    timings = {}
+    parts = []
+    started = time.perf_counter()
+    with client.beta.threads.create_and_run_stream(
+        assistant_id=assistant_id,
+        thread={"messages": [{"role": "user", "content": query}]},
+    ) as stream:
+        for text in stream.text_deltas:
+            if not parts:
+                timings["primeiro_token"] = time.perf_counter() - started
+            parts.append(text)
+    timings["resposta"] = time.perf_counter() - started
+    return timings, "".join(parts)
+
+def report(name, samples):
+    stages = [stage for stage in samples[0]]
+    summary = ", ".join(
+        f"{stage}={statistics.median(sample[stage] for sample in samples) * 1000:.0f}ms"
+        for stage in stages
+    )
+    print(f"{name:<10} (mediana acumulada de {len(samples)}) {summary}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("assistant_id")
+    parser.add_argument("--query", default="Como acesso a biblioteca virtual?")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--poll-interval", type=int, default=1000, help="Intervalo de polling do fluxo antigo (ms)")
+    args = parser.parse_args()
+
+    client = OpenAI()
+    polled_samples, streamed_samples = [], []
+    for _ in range(args.runs):
+        polled_samples.append(polled(client, args.assistant_id, args.query, args.poll_interval)[0])
+        streamed_samples.append(streamed(client, args.assistant_id, args.query)[0])
+
+    report("polling", polled_samples)
+    report("streaming", streamed_samples)
@@ -0,0 +1,55 @@
+"""
+Mede a construção do índice BM25 (retrieval.py) sobre scraping/*.txt e a latência
+da busca top-k para um conjunto de perguntas típicas.
+
+Uso:
+    python benchmarks/bm25_search.py [--iterations N] [--k N]
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import retrieval
+
+QUERIES = [
+    "Como faço a rematrícula?",
+    "Qual o horário de funcionamento da biblioteca?",
+    "Onde emito a segunda via do boleto?",
+    "Como acesso as aulas virtuais pelo Teams?",
+    "Quanto custa a impressão colorida?",
+    "Como envio uma atividade no Canvas?",
+    "Quais documentos preciso para o estágio?",
+]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=retrieval.TOP_K)
+    args = parser.parse_args()
+
+    file_paths = retrieval.corpus_files()
+    start = time.perf_counter()
+    index = retrieval.build_index(file_paths)
+    build_ms = (time.perf_counter() - start) * 1000
+    size = sum(os.path.getsize(path) for path in file_paths)
+    print(f"Índice: {len(file_paths)} arquivos ({size / 1024:.0f} KB), {len(index.chunks)} trechos, "
+          f"{len(index.postings)} termos, construído em {build_ms:.0f} ms")
+
+    samples = []
+    for _ in range(args.iterations):
+        for query in QUERIES:
+            start = time.perf_counter()
+            index.search(query, args.k)
+            samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    print(f"Busca top-{args.k}: mediana {statistics.median(samples):.0f} µs, "
+          f"p99 {samples[int(len(samples) * 0.99)]:.0f} µs ({len(samples)} buscas)")
+
+    for query in QUERIES:
+        best = index.search(query, 1)
+        print(f"  {query!r} -> {best[0][1].source if best else '-'}")
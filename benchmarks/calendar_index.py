@@ -0,0 +1,110 @@
+"""
+Compara consultas ao calendário sobre milhares de eventos sintéticos:
+
+- varredura: percorre todos os eventos comparando substrings (filtro antigo de get_calendar_events)
+- índice: calendar_index.CalendarIndex (bisect sobre epochs ordenados + índice de termos dos títulos)
+
+Metade dos eventos pertence a séries semanais (como as aulas do Canvas, uma cópia completa por
+ocorrência); o índice guarda cada série como um único registro e a expande apenas no período
+consultado. Sem data, a busca do índice devolve uma página (calendar_index.SEARCH_LIMIT
+registros, uma linha por série), enquanto a varredura devolve todas as ocorrências.
+
+Uso:
+    python benchmarks/calendar_index.py [--events N] [--queries N]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+from datetime import datetime, timedelta, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import calendar_index
+
+SUBJECTS = [
+    "IA Aplicada - Python", "Cálculo I", "Física Experimental", "Banco de Dados", "Redes de Computadores",
+    "Engenharia de Software", "Estatística", "Sistemas Operacionais", "Computação Gráfica", "Ética",
+]
+
+def synthetic_events(count, seed=42):
+    rng = random.Random(seed)
+    year = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    events = []
+
+    def event(start, minutes, title, **fields):
+        events.append({
+            "id": len(events),
+            "title": title,
+            "start_at": start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "end_at": (start + timedelta(minutes=minutes)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            **fields,
+        })
+
+    # Séries semanais de 52 aulas, materializadas como o Canvas as retorna
+    for series_id in range(count // 2 // 52):
+        first = year + timedelta(days=rng.randrange(7), hours=rng.choice([11, 13, 22]))
+        title = f"Aula {rng.choice(SUBJECTS)} - Turma {series_id}"
+        minutes = rng.choice([100, 225])
+        for week in range(52):
+            event(first + timedelta(weeks=week), minutes, title, series_uuid=f"serie-{series_id}",
+                  series_head=week == 0, rrule="FREQ=WEEKLY;INTERVAL=1;COUNT=52")
+    while len(events) < count:
+        start = year + timedelta(minutes=30 * rng.randrange(365 * 48))
+        event(start, rng.choice([50, 100, 225]), f"Aula {rng.choice(SUBJECTS)} - Turma {rng.randrange(1, 20)}")
+    rng.shuffle(events)
+    return events
+
+def scan(events, title_filter=None, date_filter=None):
+    return [
+        event for event in events
+        if (title_filter.lower() in event["title"].lower() if title_filter else True)
+        and (date_filter in event["start_at"] if date_filter else True)
+    ]
+
+def scan_next(events, now, title_filter=None):
+    upcoming = [event for event in scan(events, title_filter) if event["start_at"] >= now]
+    return min(upcoming, key=lambda event: event["start_at"]) if upcoming else None
+
+def measure(function, arguments):
+    samples = []
+    for args in arguments:
+        start = time.perf_counter()
+        function(*args)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    events = synthetic_events(args.events)
+    start = time.perf_counter()
+    index = calendar_index.CalendarIndex(events)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"Índice: {len(events)} eventos do Canvas em {len(index)} registros ({len(index.series)} séries), "
+          f"{len(index.titles.vocabulary)} termos, construído em {build_ms:.0f} ms")
+
+    rng = random.Random(7)
+    days = [(datetime(2025, 1, 1) + timedelta(days=rng.randrange(365))).strftime("%Y-%m-%d") for _ in range(args.queries)]
+    titles = [rng.choice(SUBJECTS).split(" - ")[0] for _ in range(args.queries)]
+    moments = [f"{day}T12:00:00Z" for day in days]
+
+    rows = [
+        ("dia", measure(lambda day: scan(events, date_filter=day), [(day,) for day in days]),
+         measure(lambda day: index.search(date=day), [(day,) for day in days])),
+        ("título", measure(lambda title: scan(events, title_filter=title), [(title,) for title in titles]),
+         measure(lambda title: index.search(title=title), [(title,) for title in titles])),
+        ("título+dia", measure(lambda title, day: scan(events, title, day), list(zip(titles, days))),
+         measure(lambda title, day: index.search(title, day), list(zip(titles, days)))),
+        ("próxima", measure(lambda moment, title: scan_next(events, moment, title), list(zip(moments, titles))),
+         measure(lambda moment, title: index.next_event(calendar_index.parse_timestamp(moment), title), list(zip(moments, titles)))),
+    ]
+    print(f"{'consulta':<12}{'varredura':>12}{'índice':>12}")
+    for name, scanned, indexed in rows:
+        print(f"{name:<12}{scanned:>10.0f}µs{indexed:>10.0f}µs  ({scanned / max(indexed, 1e-3):.0f}x)")
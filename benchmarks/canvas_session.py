@@ -0,0 +1,109 @@
+"""
+Compara requisições avulsas (requests.get) com a sessão compartilhada do canvas_client
+em um turno de conversa típico: cursos, usuário, calendário e os módulos de N cursos (3 + N).
+
+Por padrão usa um servidor HTTP local (keep-alive, com latência de conexão simulada);
+com --url o turno é feito contra o Canvas real, usando TOKEN_CANVAS.
+
+Uso:
+    python benchmarks/canvas_session.py [--courses N] [--turns N] [--connect-latency MS] [--url URL]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, "package"))
+
+import requests
+
+import canvas_client
+
+class LocalCanvas(ThreadingHTTPServer):
+    """ Servidor que responde [] para qualquer GET e conta as conexões abertas. """
+
+    daemon_threads = True
+
+    def __init__(self, connect_latency):
+        self.connections = 0
+        self.connect_latency = connect_latency
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Cabeçalho e corpo saem em writes separados; sem isso o keep-alive esbarra no delayed ACK
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                server.connections += 1
+                # Simula o custo de handshake (TCP + TLS) de uma conexão nova
+                time.sleep(server.connect_latency)
+                super().setup()
+
+            def do_GET(self):
+                body = json.dumps([]).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        super().__init__(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/api/v1"
+
+def chat_turn(get, url, headers, courses):
+    endpoints = ["/courses", "/users/self", "/calendar_events"]
+    endpoints += [f"/courses/{course_id}/modules" for course_id in range(courses)]
+    for endpoint in endpoints:
+        # O status não importa aqui (ex.: IDs de curso fictícios no Canvas real), só o custo da ida e volta
+        get(f"{url}{endpoint}", headers=headers)
+    return len(endpoints)
+
+def standalone_get(url, headers=None):
+    return requests.get(url, headers=headers, timeout=30)
+
+def shared_get(url, headers=None):
+    return canvas_client.get(url, headers=headers)
+
+def run(name, get, url, headers, courses, turns, server=None):
+    connections = server.connections if server else 0
+    start = time.perf_counter()
+    for _ in range(turns):
+        count = chat_turn(get, url, headers, courses)
+    elapsed = time.perf_counter() - start
+    line = f"{name:<20} {count} requisições/turno  {elapsed / turns * 1000:8.1f} ms/turno"
+    if server:
+        line += f"  {server.connections - connections} conexões"
+    print(line)
+    return elapsed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--courses", type=int, default=5, help="Cursos por turno (N)")
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--connect-latency", type=float, default=20, help="Latência por conexão nova no servidor local (ms)")
+    parser.add_argument("--url", help="URL base da API do Canvas (ex.: https://.../api/v1)")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    headers = {"Authorization": f"Bearer {os.getenv('TOKEN_CANVAS')}"}
+    if not url:
+        server = LocalCanvas(args.connect_latency / 1000)
+        url = server.url
+
+    baseline = run("requests.get", standalone_get, url, headers, args.courses, args.turns, server)
+    shared = run("canvas_client.get", shared_get, url, headers, args.courses, args.turns, server)
+    print(f"Ganho: {baseline / shared:.1f}x")
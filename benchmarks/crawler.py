@@ -0,0 +1,108 @@
+"""
+Mede a atualização do corpus pelo crawler (extract_data.py) contra um servidor local que
+serve os arquivos de scraping/*.txt como páginas HTML, com latência artificial por requisição:
+
+- serial: requests.get página a página, sem requisições condicionais (fluxo antigo)
+- crawler (frio): asyncio, sem validadores salvos
+- crawler (sem mudanças): If-None-Match / If-Modified-Since, todas as páginas voltam 304
+
+Uso:
+    python benchmarks/crawler.py [--latency MS] [--max-per-host N]
+"""
+import os
+import sys
+import html
+import time
+import glob
+import asyncio
+import hashlib
+import argparse
+import tempfile
+import threading
+from email.utils import formatdate
+from urllib.parse import quote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, "package"))
+
+import requests
+
+import extract_data
+
+def start_server(pages, latency):
+    modified = formatdate(usegmt=True)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Cabeçalhos e corpo saem em writes separados; sem isso o Nagle atrasa cada resposta
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(latency)
+            body = pages.get(self.path)
+            if body is None:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", modified)
+            self.end_headers()
+            self.wfile.write(body)
+
+    class Server(ThreadingHTTPServer):
+        # A fila padrão (5) descarta conexões simultâneas, que só voltam após o reenvio do SYN (1 s)
+        request_queue_size = 64
+
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def serial(urls):
+    started = time.perf_counter()
+    size = 0
+    for url in urls:
+        response = requests.get(url, headers=extract_data.headers)
+        extract_data.page_text(response.text)
+        size += len(response.content)
+    return time.perf_counter() - started, size
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency", type=float, default=100, help="Latência por requisição (ms)")
+    parser.add_argument("--max-per-host", type=int, default=extract_data.MAX_PER_HOST)
+    args = parser.parse_args()
+
+    pages, names = {}, []
+    for path in sorted(glob.glob(os.path.join(ROOT, "scraping", "*.txt"))):
+        with open(path, encoding="utf-8") as f:
+            paragraphs = "".join(f"<p>{html.escape(line)}</p>" for line in f.read().splitlines())
+        names.append(os.path.basename(path))
+        pages["/" + quote(names[-1])] = f"<html><body>{paragraphs}</body></html>".encode()
+
+    server, base_url = start_server(pages, args.latency / 1000)
+    targets = {name: [f"{base_url}/{quote(name)}"] for name in names}
+    print(f"{len(targets)} páginas, latência {args.latency:.0f} ms, até {args.max_per_host} por host")
+
+    seconds, size = serial(urls[0] for urls in targets.values())
+    print(f"{'serial':<24}{seconds:>7.2f}s {size / 1024:>8.1f} KB")
+    with tempfile.TemporaryDirectory() as directory:
+        for name in ("crawler (frio)", "crawler (sem mudanças)"):
+            summary = asyncio.run(extract_data.crawl(targets, directory, args.max_per_host))
+            print(f"{name:<24}{summary['seconds']:>7.2f}s {summary['bytes'] / 1024:>8.1f} KB "
+                  f"({summary['not_modified']} sem alteração, {summary['written']} regravados)")
+    server.shutdown()
@@ -0,0 +1,74 @@
+"""
+Mede o custo de importação (cold start) dos módulos da Lambda.
+
+Executa cada módulo em um interpretador novo com `python -X importtime` e
+reporta o tempo total de importação e as dependências mais caras.
+
+Uso:
+    python benchmarks/import_time.py [modulo ...] [--top N]
+"""
+import os
+import sys
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODULES = ["lambda_function", "vector_store", "pgsql", "openai", "requests"]
+
+def _run(code):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([ROOT, os.path.join(ROOT, "package")])
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        env=env,
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+
+def _parse(stderr):
+    """ Retorna [(nome, self_ms, cumulativo_ms)] a partir da saída de -X importtime. """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        entries.append((name.rstrip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+    return entries
+
+def import_time(module):
+    """ Retorna (tempo total em ms, {pacote: tempo próprio em ms}) ou (None, erro). """
+    startup = {name.strip() for name, _, _ in _parse(_run("pass").stderr)}
+    result = _run(f"import {module}")
+    if result.returncode != 0:
+        return None, result.stderr.strip().splitlines()[-1]
+
+    total = 0
+    packages = {}
+    for name, self_ms, cumulative_ms in _parse(result.stderr):
+        if name.strip() in startup:
+            continue
+        if name == f" {module}":
+            total = cumulative_ms
+        top_level = name.strip().split(".")[0]
+        packages[top_level] = packages.get(top_level, 0) + self_ms
+    return total, packages
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--top", type=int, default=5)
+    args = parser.parse_args()
+
+    for module in args.modules:
+        total, packages = import_time(module)
+        if total is None:
+            print(f"{module:<20} falhou: {packages}")
+            continue
+        print(f"{module:<20} {total:9.1f} ms")
+        heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]
+        for name, elapsed in heaviest:
+            print(f"    {name:<24} {elapsed:9.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Compara a inserção linha a linha com Statement.executemany (pipeline) no pgsql.
+
+Requer um PostgreSQL local; usa as mesmas variáveis de ambiente da Lambda
+(DB_HOST, DB_USER, DB_PASSWORD, DB_NAME). As linhas vão para uma tabela
+temporária com o formato de chat_history.
+
+Uso:
+    python benchmarks/pgsql_pipeline.py [--rows N] [--batch-size N]
+"""
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "package"))
+
+import pgsql
+
+CREATE_TABLE = """
+CREATE TEMPORARY TABLE bench_chat_history (
+    id SERIAL PRIMARY KEY,
+    username TEXT NOT NULL,
+    message TEXT NOT NULL,
+    chat_response TEXT NOT NULL,
+    date TIMESTAMP NOT NULL
+);
+"""
+
+INSERT = """
+INSERT INTO bench_chat_history (username, message, chat_response, date)
+VALUES ($1, $2, $3, $4)
+"""
+
+def connect():
+    db = pgsql.Connection(
+        address=(os.getenv("DB_HOST", "localhost"), int(os.getenv("DB_PORT", "5432"))),
+        user=os.getenv("DB_USER", "postgres"),
+        password=os.getenv("DB_PASSWORD"),
+        database=os.getenv("DB_NAME"),
+    )
+    # Conta as idas e voltas pelo número de mensagens Sync enviadas
+    db.round_trips = 0
+    send_message = db._send_message
+    def counting_send(data):
+        db.round_trips += data.count(b"S\x00\x00\x00\x04")
+        send_message(data)
+    db._send_message = counting_send
+    return db
+
+def rows(count):
+    now = datetime.now()
+    for i in range(count):
+        yield ("aluno", f"Pergunta {i}", f"Resposta {i}", now)
+
+def per_call(db, count, batch_size):
+    with db.prepare(INSERT) as insert:
+        for row in rows(count):
+            insert(*row)
+
+def pipelined(db, count, batch_size):
+    with db.prepare(INSERT) as insert:
+        insert.executemany(rows(count), batch_size=batch_size)
+
+def run(name, method, count, batch_size):
+    with connect() as db:
+        db.execute(CREATE_TABLE)
+        db.round_trips = 0
+        start = time.perf_counter()
+        method(db, count, batch_size)
+        elapsed = time.perf_counter() - start
+        round_trips = db.round_trips
+        inserted = db.prepare("SELECT count(*) FROM bench_chat_history")().col()
+    print(f"{name:<12} {inserted:>8} linhas {elapsed:8.3f} s {inserted / elapsed:12.0f} linhas/s {round_trips:>8} round trips")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    run("por chamada", per_call, args.rows, args.batch_size)
+    run("pipeline", pipelined, args.rows, args.batch_size)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Remoção de boilerplate (menus, rodapés, sumários repetidos) dos textos extraídos do site.
+
+Os shingles detectados ficam salvos em scraping/.boilerplate.json: o corpus gravado já está
+limpo e não serve mais de referência, então páginas baixadas de novo (uma de cada vez, pelo
+crawler) são limpas com o boilerplate aprendido nas páginas originais.
+
+Uso:
+    python boilerplate.py [diretorio]   # limpa os .txt do diretório (padrão: ./scraping)
+"""
+import os
+import sys
+import json
+import glob
+import logging
+import tempfile
+from collections import Counter
+
+# Linhas consecutivas por shingle e fração mínima de documentos em que ele precisa aparecer
+SHINGLE_SIZE = int(os.getenv("BOILERPLATE_SHINGLE_SIZE", "3"))
+MIN_SHARE = float(os.getenv("BOILERPLATE_MIN_SHARE", "0.3"))
+
+logger = logging.getLogger(__name__)
+
+def _lines(text):
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+def _shingles(lines, size=SHINGLE_SIZE):
+    return [tuple(lines[i:i + size]) for i in range(len(lines) - size + 1)]
+
+def find_boilerplate(documents, size=SHINGLE_SIZE, min_share=MIN_SHARE, total=None):
+    """
+    Identifica os shingles (sequências de size linhas) que se repetem entre documentos.
+
+    Um shingle é boilerplate quando aparece em pelo menos min_share dos documentos
+    (e em no mínimo dois). Sequências de linhas, e não linhas soltas, evitam remover
+    linhas curtas e legítimas que só por acaso aparecem em várias páginas.
+
+    Args:
+        documents (list): Textos das páginas.
+        total (int): Tamanho do corpus usado no limiar (padrão: len(documents)), para que
+            poucas páginas baixadas de novo não bastem para marcar um trecho como boilerplate.
+
+    Returns:
+        set: Shingles considerados boilerplate.
+    """
+    documents = list(documents)
+    frequency = Counter()
+    for text in documents:
+        frequency.update(set(_shingles(_lines(text), size)))
+    threshold = max(2, min_share * (total or len(documents)))
+    return {shingle for shingle, count in frequency.items() if count >= threshold}
+
+def strip_boilerplate(text, boilerplate, size=SHINGLE_SIZE):
+    """
+    Remove do texto as linhas cobertas por shingles de boilerplate e os blocos repetidos
+    dentro do próprio documento (a mesma página extraída mais de uma vez).
+    """
+    lines = _lines(text)
+    remove = [False] * len(lines)
+    seen = set()
+    for i, shingle in enumerate(_shingles(lines, size)):
+        if shingle in boilerplate or shingle in seen:
+            remove[i:i + size] = [True] * size
+        seen.add(shingle)
+    return "\n".join(line for line, removed in zip(lines, remove) if not removed)
+
+def clean_documents(documents, known=(), size=SHINGLE_SIZE, min_share=MIN_SHARE, total=None):
+    """
+    Limpa um conjunto de documentos.
+
+    Args:
+        documents (dict): {nome: texto} a limpar.
+        known (set): Shingles de boilerplate já aprendidos (ver load_boilerplate).
+        total (int): Tamanho do corpus, repassado a find_boilerplate.
+
+    Returns:
+        tuple: ({nome: texto limpo}, shingles usados: known mais os detectados em documents)
+    """
+    boilerplate = set(known) | find_boilerplate(documents.values(), size, min_share, total)
+    cleaned = {}
+    for name, text in documents.items():
+        cleaned[name] = strip_boilerplate(text, boilerplate, size)
+        report(name, text, cleaned[name])
+    return cleaned, boilerplate
+
+def boilerplate_path(directory="./scraping"):
+    return os.path.join(directory, ".boilerplate.json")
+
+def load_boilerplate(directory="./scraping"):
+    """ Shingles de boilerplate salvos no diretório (conjunto vazio se ainda não houver). """
+    try:
+        with open(boilerplate_path(directory), encoding="utf-8") as f:
+            return {tuple(shingle) for shingle in json.load(f)}
+    except FileNotFoundError:
+        return set()
+    except (OSError, ValueError) as e:
+        logger.error(f"Falha ao ler o boilerplate salvo: {str(e)}")
+        return set()
+
+def save_boilerplate(boilerplate, directory="./scraping"):
+    write_atomic(boilerplate_path(directory), json.dumps(sorted(boilerplate), ensure_ascii=False, indent=1))
+
+def report(name, before, after):
+    """ Registra a redução de tamanho de um documento. """
+    reduction = 1 - len(after) / len(before) if before else 0.0
+    logger.info(f"{name}: {len(before)} -> {len(after)} caracteres ({reduction:.0%} removidos)")
+    return reduction
+
+def write_atomic(path, text):
+    """ Grava o arquivo de forma atômica (arquivo temporário + rename). """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".scraping-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(text)
+    # mkstemp cria o arquivo com permissão 0600; o corpus precisa continuar legível
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+
+def clean_directory(directory="./scraping"):
+    """
+    Remove o boilerplate de todos os .txt do diretório, reescrevendo apenas os que mudaram, e
+    acrescenta os shingles detectados aos já salvos.
+    """
+    paths = sorted(glob.glob(os.path.join(directory, "*.txt")))
+    documents = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            documents[path] = f.read()
+
+    known = load_boilerplate(directory)
+    cleaned, boilerplate = clean_documents(documents, known)
+    if boilerplate != known:
+        save_boilerplate(boilerplate, directory)
+    before = sum(len(text) for text in documents.values())
+    after = sum(len(text) for text in cleaned.values())
+    for path, text in cleaned.items():
+        if text != documents[path]:
+            write_atomic(path, text)
+    logger.info(f"Total: {before} -> {after} caracteres ({1 - after / max(before, 1):.0%} removidos)")
+    return cleaned
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    clean_directory(sys.argv[1] if len(sys.argv) > 1 else "./scraping")
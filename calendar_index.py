@@ -0,0 +1,342 @@
+"""
+Índice em memória dos eventos do calendário do Canvas, construído uma vez por snapshot.
+
+Os horários de início e fim são convertidos em epochs e ordenados, então consultas por período
+e pela próxima aula são buscas binárias (bisect); os títulos formam um índice invertido de
+termos, com o vocabulário ordenado para buscar termos por prefixo.
+
+Séries recorrentes (eventos com o mesmo series_uuid e uma rrule) são guardadas como um único
+registro mestre; o índice expande a regra apenas em epochs e os registros das ocorrências são
+gerados sob demanda, só para as que fazem parte do resultado de uma consulta.
+"""
+import os
+import time
+import heapq
+import bisect
+import logging
+import itertools
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from dateutil.rrule import rrulestr
+
+import tokenizer
+
+# Fuso em que as datas informadas pelo usuário ("no dia 17 de fevereiro") são interpretadas
+# e em que as regras de recorrência são expandidas
+CALENDAR_TIMEZONE = os.getenv("CALENDAR_TIMEZONE", "America/Sao_Paulo")
+# Alcance da expansão de cada série no índice, a partir de agora (ou da primeira ocorrência,
+# se ela ainda não aconteceu)
+SERIES_HORIZON_DAYS = int(os.getenv("CALENDAR_SERIES_HORIZON_DAYS", "366"))
+# Registros por página em search sem data
+SEARCH_LIMIT = int(os.getenv("CALENDAR_SEARCH_LIMIT", "20"))
+
+# Campos que uma ocorrência precisa compartilhar com o mestre para ser descartada na compactação
+SERIES_FIELDS = ("title", "description", "location_name", "location_address", "workflow_state", "all_day")
+
+logger = logging.getLogger(__name__)
+
+def parse_timestamp(value):
+    """ Converte um horário ISO 8601 do Canvas ('2025-02-17T22:00:00Z') em epoch (segundos). """
+    moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+def format_timestamp(value):
+    """ Epoch -> horário ISO 8601 em UTC, no formato do Canvas. """
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(value))
+
+def day_range(date, tz=CALENDAR_TIMEZONE):
+    """ Intervalo [início, fim) em epochs do dia 'YYYY-MM-DD' no fuso tz. """
+    start = datetime.fromisoformat(date).replace(tzinfo=ZoneInfo(tz))
+    return start.timestamp(), (start + timedelta(days=1)).timestamp()
+
+def date_window(start_date, end_date, tz=CALENDAR_TIMEZONE):
+    """ Período [início, fim) em epochs de start_date a end_date ('YYYY-MM-DD', inclusive). """
+    return day_range(start_date, tz)[0], day_range(end_date, tz)[1]
+
+def _start_key(event):
+    return parse_timestamp(event["start_at"])
+
+class Series:
+    """
+    Série recorrente: o evento mestre (primeira ocorrência, com a rrule) e as ocorrências
+    excluídas (exdates), que o Canvas removeu ou moveu.
+    """
+
+    def __init__(self, master, tz=CALENDAR_TIMEZONE):
+        self.master = master
+        self.first = parse_timestamp(master["start_at"])
+        self.duration = max(0.0, parse_timestamp(master.get("end_at") or master["start_at"]) - self.first)
+        # Expandida no fuso local: "toda segunda às 19h" continua às 19h em qualquer época do ano
+        dtstart = datetime.fromtimestamp(self.first, ZoneInfo(tz))
+        self.rule = rrulestr(master["rrule"], dtstart=dtstart)
+        self.exdates = {parse_timestamp(value) for value in master.get("exdates", [])}
+        self._template = {key: value for key, value in master.items() if key != "exdates"}
+
+    def starts(self, start, end):
+        """ Gera os epochs de início previstos pela regra (sem excluir os exdates) em [start, end). """
+        after = datetime.fromtimestamp(start, timezone.utc)
+        for moment in self.rule.xafter(after, inc=True):
+            begin = moment.timestamp()
+            if begin >= end:
+                return
+            yield begin
+
+    def occurrence(self, begin):
+        return dict(
+            self._template,
+            start_at=format_timestamp(begin),
+            end_at=format_timestamp(begin + self.duration),
+            series_head=begin == self.first,
+        )
+
+def _same_occurrence(event, master, duration):
+    try:
+        event_duration = parse_timestamp(event.get("end_at") or event["start_at"]) - parse_timestamp(event["start_at"])
+    except (KeyError, TypeError, ValueError):
+        return False
+    return event_duration == duration and all(event.get(field) == master.get(field) for field in SERIES_FIELDS)
+
+def split_series(events, window=None):
+    """
+    Separa os eventos avulsos das séries recorrentes.
+
+    Em cada série, as ocorrências previstas pela regra e idênticas ao mestre são descartadas;
+    as que foram alteradas no Canvas continuam como eventos avulsos, e as previstas que não
+    vieram do Canvas viram exdates. Séries cujo mestre (series_head) não veio, ou cuja regra
+    não pode ser interpretada, ficam com as ocorrências avulsas.
+
+    Args:
+        events (iterable): Eventos do Canvas (ou registros já compactados).
+        window (tuple): Período (epochs) consultado no Canvas; as ocorrências previstas nele e
+            ausentes viram exdates. Sem ele (registros já compactados) apenas os exdates do
+            mestre são mantidos.
+
+    Returns:
+        tuple: (eventos avulsos, [Series])
+    """
+    singles, groups = [], defaultdict(list)
+    for event in events:
+        if event.get("series_uuid") and event.get("rrule"):
+            groups[event["series_uuid"]].append(event)
+        else:
+            singles.append(event)
+
+    series = []
+    for series_uuid, members in groups.items():
+        head = next((event for event in members if event.get("series_head")), None)
+        try:
+            current = Series(head) if head else None
+            present = [_start_key(event) for event in members]
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Série {series_uuid} mantida sem compactação: {str(e)}")
+            current = None
+        if current is None:
+            singles.extend(members)
+            continue
+
+        start, end = window or (min(present), max(present) + 1)
+        predicted = set(current.starts(start, end))
+        matched = {current.first}
+        for event, begin in zip(members, present):
+            if event is head:
+                continue
+            if begin in predicted and _same_occurrence(event, head, current.duration):
+                matched.add(begin)
+            else:
+                singles.append(event)
+
+        exdates = current.exdates - matched
+        if window:
+            exdates |= predicted - matched
+        master = {key: value for key, value in head.items() if key != "exdates"}
+        if exdates:
+            master["exdates"] = [format_timestamp(value) for value in sorted(exdates)]
+        series.append(Series(master))
+    return singles, series
+
+def collapse_series(events, window=None):
+    """ Registros a gravar: os eventos avulsos e um registro mestre por série (ver split_series). """
+    singles, series = split_series(events, window)
+    return singles + [current.master for current in series]
+
+class TermIndex:
+    """ Índice invertido dos termos dos títulos, com o vocabulário ordenado para buscas por prefixo. """
+
+    def __init__(self, titles):
+        postings = defaultdict(list)
+        terms = {}
+        for position, title in enumerate(titles):
+            if title not in terms:
+                terms[title] = set(tokenizer.tokenize(title or ""))
+            for term in terms[title]:
+                postings[term].append(position)
+        # Posições crescentes: cada lista de ocorrências já está ordenada
+        self.postings = dict(postings)
+        self.vocabulary = sorted(self.postings)
+
+    def _words(self, term):
+        """ Termos do vocabulário que começam com term. """
+        lo = bisect.bisect_left(self.vocabulary, term)
+        hi = bisect.bisect_left(self.vocabulary, term + "\uffff")
+        return self.vocabulary[lo:hi]
+
+    def matching(self, title, limit=None, lo=0, hi=None):
+        """
+        Posições (ordenadas) em [lo, hi) dos títulos que contêm todos os termos de title, cada um
+        como prefixo de um termo do título ('pyth' encontra 'Python'); no máximo limit posições.
+        Retorna None se title não tiver termos, isto é, se não houver filtro de título.
+
+        A interseção parte do termo com menos ocorrências e procura cada posição nas listas dos
+        demais com buscas binárias que só avançam (as listas e as posições são crescentes).
+        """
+        terms = set(tokenizer.tokenize(title)) if title else set()
+        if not terms:
+            return None
+        groups = []
+        for term in terms:
+            lists = [self.postings[word] for word in self._words(term)]
+            if not lists:
+                return []
+            groups.append(lists)
+        groups.sort(key=lambda lists: sum(map(len, lists)))
+
+        clip = lambda positions: positions[
+            bisect.bisect_left(positions, lo):len(positions) if hi is None else bisect.bisect_left(positions, hi)
+        ]
+        first = groups[0]
+        # Termo que é prefixo de vários termos do vocabulário: as listas são intercaladas sob demanda
+        candidates = clip(first[0]) if len(first) == 1 else (
+            position for position, _ in itertools.groupby(heapq.merge(*map(clip, first)))
+        )
+        if len(groups) == 1:
+            return list(itertools.islice(candidates, limit))
+
+        result = []
+        cursors = [[bisect.bisect_left(positions, lo) for positions in lists] for lists in groups[1:]]
+        for position in candidates:
+            for lists, cursor in zip(groups[1:], cursors):
+                found = False
+                for k, positions in enumerate(lists):
+                    cursor[k] = bisect.bisect_left(positions, position, cursor[k])
+                    if cursor[k] < len(positions) and positions[cursor[k]] == position:
+                        found = True
+                        break
+                if not found:
+                    break
+            else:
+                result.append(position)
+                if limit is not None and len(result) >= limit:
+                    break
+        return result
+
+def _title(entry):
+    return (entry.master if isinstance(entry, Series) else entry).get("title")
+
+class CalendarIndex:
+    """
+    Linha do tempo ordenada pelo início, com os epochs de início e fim em listas paralelas.
+
+    Cada posição é um evento avulso ou uma ocorrência de série; para as séries a linha do tempo
+    guarda apenas os epochs e a Series, e o registro da ocorrência é gerado só quando ela faz
+    parte de um resultado.
+
+    Um evento se sobrepõe a [start, end) quando começa antes de end e termina depois de start.
+    Como nenhum evento dura mais que max_duration, os candidatos são os que começam em
+    [start - max_duration, end), uma fatia obtida com duas buscas binárias.
+
+    As séries são expandidas da primeira ocorrência até SERIES_HORIZON_DAYS depois de now
+    (epoch; padrão: agora). Para as buscas sem data há também a lista dos registros (eventos
+    avulsos e um mestre por série), ordenada pelo início e com o seu próprio índice de títulos.
+    """
+
+    def __init__(self, events, window=None, now=None):
+        self.signature = None
+        singles, self.series = split_series(events or [], window)
+        timed = []
+        skipped = 0
+        for event in singles:
+            try:
+                start = parse_timestamp(event["start_at"])
+                end = parse_timestamp(event.get("end_at") or event["start_at"])
+            except (KeyError, TypeError, ValueError):
+                skipped += 1
+                continue
+            timed.append((start, max(start, end), event))
+        if skipped:
+            logger.warning(f"{skipped} eventos do calendário sem horário válido foram ignorados")
+        # Registros (avulsos e mestres) para as buscas sem data, antes da expansão das séries
+        records = sorted(
+            [(start, event) for start, _, event in timed] + [(current.first, current) for current in self.series],
+            key=lambda item: item[0],
+        )
+        self.records = [entry for _, entry in records]
+        self.record_titles = TermIndex(_title(entry) for entry in self.records)
+
+        # Séries sem fim que começaram há mais de um horizonte continuam gerando aulas futuras
+        now = time.time() if now is None else now
+        horizon = SERIES_HORIZON_DAYS * 86400
+        for current in self.series:
+            for begin in current.starts(current.first, max(current.first, now) + horizon):
+                if begin not in current.exdates:
+                    timed.append((begin, begin + current.duration, current))
+        timed.sort(key=lambda item: item[0])
+
+        self.starts = [start for start, _, _ in timed]
+        self.ends = [end for _, end, _ in timed]
+        self.entries = [entry for _, _, entry in timed]
+        self.max_duration = max((end - start for start, end, _ in timed), default=0)
+        self.titles = TermIndex(_title(entry) for entry in self.entries)
+
+    def __len__(self):
+        """ Registros indexados: eventos avulsos mais um por série. """
+        return len(self.records)
+
+    def _event(self, position):
+        entry = self.entries[position]
+        return entry.occurrence(self.starts[position]) if isinstance(entry, Series) else entry
+
+    def between(self, start, end, title=None):
+        """ Eventos que se sobrepõem ao intervalo [start, end) (epochs), em ordem de início. """
+        lo = bisect.bisect_left(self.starts, start - self.max_duration)
+        hi = bisect.bisect_left(self.starts, end)
+        positions = self.titles.matching(title, lo=lo, hi=hi)
+        if positions is None:
+            positions = range(lo, hi)
+        return [
+            self._event(i) for i in positions
+            if self.ends[i] > start or self.starts[i] >= start
+        ]
+
+    def on_day(self, date, title=None, tz=CALENDAR_TIMEZONE):
+        """ Eventos do dia 'YYYY-MM-DD' (no fuso tz, não em UTC). """
+        return self.between(*day_range(date, tz), title)
+
+    def next_event(self, now=None, title=None):
+        """ Primeiro evento que começa a partir de now (epoch; padrão: agora), ou None. """
+        i = bisect.bisect_left(self.starts, time.time() if now is None else now)
+        positions = self.titles.matching(title, limit=1, lo=i)
+        if positions is None:
+            return self._event(i) if i < len(self.entries) else None
+        return self._event(positions[0]) if positions else None
+
+    def search(self, title=None, date=None, limit=SEARCH_LIMIT, offset=0):
+        """
+        Eventos filtrados pelo título e/ou pela data 'YYYY-MM-DD', em ordem de início.
+
+        Com data, as ocorrências do dia. Sem data, os registros: cada série aparece uma vez, como o
+        seu mestre (primeira ocorrência, com a rrule e os exdates), e o resultado é paginado por
+        limit e offset, sem expandir as séries.
+        """
+        if date:
+            return self.on_day(date, title)
+        positions = self.record_titles.matching(title, offset + limit)
+        if positions is None:
+            positions = range(len(self.records))
+        return [
+            entry.master if isinstance(entry, Series) else entry
+            for entry in (self.records[i] for i in positions[offset:offset + limit])
+        ]
@@ -0,0 +1,233 @@
+"""
+Sincronização incremental do calendário do Canvas com o snapshot local (calendar_data.txt).
+
+- Janela móvel relativa a hoje (CALENDAR_PAST_DAYS para trás, CALENDAR_FUTURE_DAYS para frente),
+  alinhada a semanas para que os parâmetros, e com eles os ETags, durem entre as execuções.
+- Cada página é pedida com If-None-Match: páginas sem alteração voltam como 304, sem corpo. A API
+  do Canvas não filtra eventos por updated_at, então é assim que só o que mudou é transferido.
+- A marca d'água (maior updated_at já sincronizado) separa, nas páginas alteradas, os eventos
+  novos ou modificados; só eles são reprocessados.
+- Eventos da janela que o Canvas deixou de retornar são removidos do snapshot; ocorrências de
+  séries que sumiram viram exdates do registro mestre, e séries sem nenhum evento na janela
+  são removidas com o mestre.
+
+O estado (marca d'água, janela e, por página, o ETag e um resumo dos eventos) fica em
+.calendar_sync.json, ao lado do snapshot.
+"""
+import os
+import json
+import logging
+import tempfile
+from datetime import date, timedelta
+from urllib.parse import urlencode
+
+import canvas_client
+import canvas_snapshot
+import calendar_index
+
+CALENDAR_PAST_DAYS = int(os.getenv("CALENDAR_PAST_DAYS", "30"))
+CALENDAR_FUTURE_DAYS = int(os.getenv("CALENDAR_FUTURE_DAYS", "180"))
+# Máximo aceito pelo Canvas
+PER_PAGE = 100
+# Partes do evento que o chatbot não usa e que o Canvas omite com excludes[]
+EXCLUDES = ("assignment", "child_events")
+
+logger = logging.getLogger(__name__)
+
+def window_params(today=None, past_days=CALENDAR_PAST_DAYS, future_days=CALENDAR_FUTURE_DAYS):
+    """
+    start_date/end_date da janela móvel: de past_days atrás até future_days à frente, estendida
+    até a segunda-feira anterior e o domingo seguinte para mudar só uma vez por semana.
+    """
+    today = today or date.today()
+    start = today - timedelta(days=past_days)
+    end = today + timedelta(days=future_days)
+    start -= timedelta(days=start.weekday())
+    end += timedelta(days=6 - end.weekday())
+    return {"start_date": start.isoformat(), "end_date": end.isoformat()}
+
+def calendar_params(today=None):
+    """ Parâmetros de /calendar_events para a janela móvel. """
+    return {**window_params(today), "excludes[]": EXCLUDES}
+
+def state_path(path):
+    return os.path.join(os.path.dirname(os.path.abspath(path)), ".calendar_sync.json")
+
+def load_state(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.error(f"Falha ao ler o estado da sincronização '{path}': {str(e)}")
+        return {}
+
+def save_state(state, path):
+    """ Grava o estado de forma atômica (arquivo temporário + rename). """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".calendar_sync-")
+    with os.fdopen(fd, "w") as f:
+        json.dump(state, f, indent=2)
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+
+def page_key(url, params=None):
+    return f"{url}?{urlencode(sorted(params.items()), doseq=True)}" if params else url
+
+def summary(event):
+    """ Resumo de um evento guardado no estado: [id, series_uuid, start_at, updated_at]. """
+    return [event["id"], event.get("series_uuid"), event.get("start_at"), event.get("updated_at")]
+
+def _in_window(start_at, window):
+    try:
+        return window[0] <= calendar_index.parse_timestamp(start_at) < window[1]
+    except (TypeError, ValueError):
+        return False
+
+def _is_master(record):
+    return bool(record.get("series_head") and record.get("rrule"))
+
+def _expected(master, window):
+    """ Se a regra do mestre prevê, na janela, alguma ocorrência que não está nos exdates. """
+    try:
+        series = calendar_index.Series(master)
+    except (KeyError, TypeError, ValueError):
+        return False
+    return any(begin not in series.exdates for begin in series.starts(*window))
+
+def _refresh_exdates(master, current, records, window):
+    """
+    Recalcula os exdates do mestre dentro da janela: ocorrências previstas pela regra que não
+    vieram do Canvas ou que foram gravadas como eventos avulsos (movidas ou alteradas).
+    """
+    try:
+        series = calendar_index.Series(master)
+    except (KeyError, TypeError, ValueError):
+        return master
+    present = set()
+    for event_id, series_uuid, start_at, _ in current.values():
+        if series_uuid != master["series_uuid"] or (event_id in records and event_id != master["id"]):
+            continue
+        try:
+            present.add(calendar_index.parse_timestamp(start_at))
+        except (TypeError, ValueError):
+            continue
+    outside = {value for value in series.exdates if not window[0] <= value < window[1]}
+    exdates = outside | (set(series.starts(*window)) - present)
+    if exdates == series.exdates:
+        return master
+    refreshed = {key: value for key, value in master.items() if key != "exdates"}
+    if exdates:
+        refreshed["exdates"] = [calendar_index.format_timestamp(value) for value in sorted(exdates)]
+    return refreshed
+
+def sync(path, url, headers, today=None):
+    """
+    Sincroniza o snapshot do calendário com o Canvas.
+
+    Args:
+        path (str): Snapshot JSONL do calendário.
+        url (str): URL do endpoint /calendar_events.
+        headers (dict): Cabeçalhos das requisições (Authorization).
+        today (date): Referência da janela móvel (padrão: hoje).
+
+    Returns:
+        dict: {"pages", "not_modified", "bytes", "changed", "deleted", "written"}
+
+    Raises:
+        requests.exceptions.RequestException, ValueError: Em falhas do Canvas; o snapshot e o
+            estado anteriores são mantidos.
+    """
+    original = {record["id"]: record for record in canvas_snapshot.read_records(path)}
+    # Sem o snapshot, os 304 não teriam de onde tirar os eventos: a sincronização recomeça do zero
+    state = load_state(state_path(path)) if original else {}
+    cached_pages = state.get("pages", {})
+    high_water_mark = state.get("high_water_mark", "")
+    previous = {entry[0] for page in cached_pages.values() for entry in page["events"]}
+    params = window_params(today)
+    window = calendar_index.date_window(**params)
+
+    pages, incoming = {}, []
+    stats = {"pages": 0, "not_modified": 0, "bytes": 0}
+
+    def fetch_page(page_url, page_params=None):
+        key = page_key(page_url, page_params)
+        cached = cached_pages.get(key)
+        request_headers = dict(headers)
+        if cached and cached.get("etag"):
+            request_headers["If-None-Match"] = cached["etag"]
+        response = canvas_client.get(page_url, headers=request_headers, params=page_params)
+        stats["pages"] += 1
+        # Not Modified: os eventos da página são os da última sincronização (um 304 não traz o Link)
+        if response.status_code == 304 and cached:
+            stats["not_modified"] += 1
+            pages[key] = cached
+            return [], cached["next"]
+        response.raise_for_status()
+        data = response.json()
+        stats["bytes"] += len(response.content)
+        next_url = response.links.get("next", {}).get("url")
+        pages[key] = {"etag": response.headers.get("ETag"), "next": next_url, "events": [summary(event) for event in data]}
+        incoming.extend(data)
+        return data, next_url
+
+    first_page = {"per_page": PER_PAGE, **calendar_params(today)}
+    for _ in canvas_client.paginate(fetch_page, url, first_page):
+        pass
+
+    current = {entry[0]: entry for page in pages.values() for entry in page["events"]}
+    records = dict(original)
+    masters = {record["series_uuid"]: record for record in records.values() if _is_master(record)}
+
+    # Eventos novos na janela ou alterados depois da marca d'água (timestamps ISO em UTC,
+    # comparáveis como texto); séries são reprocessadas junto com o mestre já gravado
+    changed = []
+    for event in incoming:
+        if event.get("updated_at", "") <= high_water_mark and event["id"] in previous:
+            continue
+        stored = masters.get(event.get("series_uuid"))
+        if _is_master(event) and stored and stored.get("exdates"):
+            # O mestre vindo do Canvas não tem exdates: os já gravados são preservados
+            event = dict(event, exdates=stored["exdates"])
+        changed.append(event)
+    heads = {event["series_uuid"] for event in changed if _is_master(event)}
+    reused = {event.get("series_uuid") for event in changed} - heads
+    singles, series = calendar_index.split_series(changed + [masters[uuid] for uuid in reused if uuid in masters])
+    kept = {record["id"] for record in singles} | {current_series.master["id"] for current_series in series}
+    for record in singles + [current_series.master for current_series in series]:
+        records[record["id"]] = record
+    # Ocorrências que voltaram a seguir a regra deixam de ser eventos avulsos
+    for event in changed:
+        if event["id"] not in kept and event["id"] in records and not _is_master(records[event["id"]]):
+            del records[event["id"]]
+
+    # Séries canceladas: a regra prevê aulas na janela, mas nenhum evento da série veio do Canvas
+    series_present = {entry[1] for entry in current.values() if entry[1]}
+    deleted = [
+        record_id for record_id, record in records.items()
+        if (_is_master(record) and record["series_uuid"] not in series_present and _expected(record, window))
+        or (not _is_master(record) and record_id not in current and _in_window(record.get("start_at"), window))
+    ]
+    for record_id in deleted:
+        del records[record_id]
+    for record_id, record in list(records.items()):
+        if _is_master(record):
+            records[record_id] = _refresh_exdates(record, current, records, window)
+
+    written = records != original
+    if written:
+        canvas_snapshot.replace(path, records.values())
+    updated = [entry[3] for entry in current.values() if entry[3]]
+    save_state({
+        "high_water_mark": max([high_water_mark] + updated),
+        "window": params,
+        "pages": pages,
+    }, state_path(path))
+
+    stats.update(changed=len(changed), deleted=len(deleted), written=written)
+    logger.info(
+        f"Calendário {params['start_date']} a {params['end_date']}: {stats['pages']} páginas "
+        f"({stats['not_modified']} sem alteração), {stats['bytes'] / 1024:.1f} KB, "
+        f"{len(changed)} eventos novos ou alterados, {len(deleted)} removidos"
+    )
+    return stats
@@ -0,0 +1,255 @@
+import os
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_CONCURRENCY = int(os.getenv("CANVAS_MAX_CONCURRENCY", "8"))
+# Timeouts (conexão, leitura) em segundos e tentativas extras para falhas transitórias
+CONNECT_TIMEOUT = float(os.getenv("CANVAS_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("CANVAS_READ_TIMEOUT", "30"))
+RETRIES = int(os.getenv("CANVAS_RETRIES", "3"))
+# Abaixo desta cota restante (X-Rate-Limit-Remaining) a concorrência é reduzida antes do 403
+RATE_LIMIT_LOW = float(os.getenv("CANVAS_RATE_LIMIT_LOW", "100"))
+# Tempo máximo (s) que uma requisição espera na fila do Throttle e é repetida após throttles
+THROTTLE_DEADLINE = float(os.getenv("CANVAS_THROTTLE_DEADLINE", "120"))
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+
+logger = logging.getLogger(__name__)
+
+# Sessão HTTP única por processo (inicializada sob demanda) e um Throttle por token
+_session = None
+_session_lock = threading.Lock()
+_throttles = {}
+
+class Throttle:
+    """
+    Controle de concorrência adaptativo (AIMD) para a cota de requisições de um token do Canvas.
+
+    O Canvas expõe a cota restante em X-Rate-Limit-Remaining (e o custo da requisição em
+    X-Request-Cost) e responde 403 "Rate Limit Exceeded" quando ela se esgota.
+
+    - Resposta normal com cota folgada: o limite de requisições simultâneas cresce de forma
+      aditiva (+1 a cada limite respostas).
+    - Cota abaixo de RATE_LIMIT_LOW: o limite cai pela metade.
+    - Throttle (403/429): o limite cai pela metade e novas requisições esperam um backoff
+      exponencial com jitter.
+
+    Requisições acima do limite aguardam a vez em vez de serem descartadas.
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self.remaining = None
+        self.throttled = 0
+        self._streak = 0
+        self._resume_at = 0.0
+        # Incrementado a cada redução: sinais de requisições anteriores a ela não reduzem de novo
+        self._epoch = 0
+        self._condition = threading.Condition()
+
+    def acquire(self, deadline=None):
+        """
+        Bloqueia até haver vaga dentro do limite e o backoff ter terminado. Retorna o token para
+        release, ou None se deadline (time.monotonic()) chegar antes.
+        """
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                wait = self._resume_at - now
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return self._epoch
+                if deadline is not None:
+                    if now >= deadline:
+                        return None
+                    wait = min(wait, deadline - now) if wait > 0 else deadline - now
+                self._condition.wait(wait if wait > 0 else None)
+
+    def release(self, epoch, response=None):
+        """ Libera a vaga e ajusta o limite conforme a resposta (None em erro de rede). """
+        with self._condition:
+            self.in_flight -= 1
+            if response is not None:
+                self._update(response, epoch)
+            self._condition.notify_all()
+
+    def _decrease(self, epoch):
+        # Uma única redução por janela: as demais requisições em voo já usavam o limite antigo
+        if epoch == self._epoch:
+            self.limit = max(1.0, self.limit / 2)
+            self._epoch += 1
+
+    def _update(self, response, epoch):
+        remaining = response.headers.get("X-Rate-Limit-Remaining")
+        if remaining is not None:
+            try:
+                self.remaining = float(remaining)
+            except ValueError:
+                pass
+
+        if is_throttled(response):
+            self.throttled += 1
+            self._streak += 1
+            self._decrease(epoch)
+            delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** self._streak))
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            self._resume_at = max(self._resume_at, time.monotonic() + delay)
+            logger.warning(
+                f"Canvas limitou as requisições (cota restante: {self.remaining}, "
+                f"custo: {response.headers.get('X-Request-Cost')}); "
+                f"aguardando {delay:.1f}s com até {int(self.limit)} simultâneas"
+            )
+            return
+
+        self._streak = 0
+        if remaining is not None and self.remaining < RATE_LIMIT_LOW:
+            self._decrease(epoch)
+        else:
+            self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+
+def is_throttled(response):
+    """ Indica se a resposta é um throttle do Canvas (403 "Rate Limit Exceeded" ou 429). """
+    if response.status_code == 429:
+        return True
+    return response.status_code == 403 and "rate limit exceeded" in response.text.lower()
+
+def get_throttle(token_header=None):
+    """ Retorna o Throttle do token (a cota do Canvas é por token, não por conexão). """
+    with _session_lock:
+        if token_header not in _throttles:
+            _throttles[token_header] = Throttle()
+        return _throttles[token_header]
+
+def get_session():
+    """
+    Retorna a sessão HTTP compartilhada por todas as chamadas ao Canvas.
+
+    As conexões ficam abertas (keep-alive) e são reaproveitadas entre requisições,
+    evitando um novo DNS + TCP + TLS a cada chamada. O pool guarda no máximo
+    MAX_CONCURRENCY conexões por host e bloqueia quando todas estão em uso.
+    GETs que falham por erro de conexão ou 5xx são repetidos com backoff exponencial;
+    throttles (403/429) ficam a cargo do Throttle (ver get).
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                # Importados aqui para não pesar no cold start de quem não chama o Canvas
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+
+                retry = Retry(
+                    total=RETRIES,
+                    backoff_factor=0.5,
+                    status_forcelist=(500, 502, 503, 504),
+                    allowed_methods=("GET", "HEAD"),
+                    respect_retry_after_header=True,
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=4,
+                    pool_maxsize=MAX_CONCURRENCY,
+                    pool_block=True,
+                    max_retries=retry,
+                )
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+def get(url, headers=None, params=None, deadline=THROTTLE_DEADLINE):
+    """
+    GET pela sessão compartilhada, com os timeouts padrão. Retorna o requests.Response.
+
+    A requisição passa pelo Throttle do token: espera a vez quando o limite de concorrência
+    foi atingido e, se o Canvas responder com throttle, volta para a fila e é repetida no ritmo
+    do Throttle até dar certo ou até deadline segundos.
+
+    Raises:
+        requests.exceptions.RetryError: Se o Canvas continuar limitando as requisições depois de deadline segundos.
+    """
+    throttle = get_throttle((headers or {}).get("Authorization"))
+    expires_at = time.monotonic() + deadline
+    attempts = 0
+    while True:
+        epoch = throttle.acquire(expires_at)
+        if epoch is None:
+            break
+        attempts += 1
+        response = None
+        try:
+            response = get_session().get(url, headers=headers, params=params, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+        finally:
+            throttle.release(epoch, response)
+        if not is_throttled(response):
+            return response
+
+    import requests
+
+    raise requests.exceptions.RetryError(
+        f"Canvas continuou limitando as requisições após {deadline:.0f}s ({attempts} tentativas): {url}"
+    )
+
+def fetch_all(fetch, items, max_concurrency=MAX_CONCURRENCY):
+    """
+    Executa fetch(item) para cada item em paralelo, com no máximo max_concurrency
+    requisições simultâneas.
+
+    Falhas são isoladas por item: uma exceção vira None no resultado e não afeta os demais.
+
+    Returns:
+        list: Resultados na mesma ordem de items.
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    def run(item):
+        try:
+            return fetch(item)
+        except Exception as e:
+            logger.error(f"Falha ao buscar {item!r}: {str(e)}")
+            return None
+
+    if max_concurrency <= 1 or len(items) == 1:
+        return [run(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(max_concurrency, len(items))) as executor:
+        return list(executor.map(run, items))
+
+def paginate(fetch_page, url, params=None, prefetch=True):
+    """
+    Percorre um endpoint de listagem do Canvas seguindo o cabeçalho Link: rel="next".
+
+    Gera os itens um a um; apenas a página atual (e a seguinte, se prefetch) fica em memória.
+    Com prefetch, a próxima página é buscada em segundo plano enquanto a atual é consumida.
+    Parar de iterar (break, close) interrompe a paginação.
+
+    Args:
+        fetch_page: Função (url, params) -> (dados, url da próxima página ou None). Deve levantar exceção em caso de erro.
+        url (str): URL da primeira página.
+        params (dict): Parâmetros da primeira página; as próximas URLs já os incluem.
+        prefetch (bool): Busca a próxima página antecipadamente.
+    """
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    try:
+        data, next_url = fetch_page(url, params)
+        while True:
+            pending = executor.submit(fetch_page, next_url, None) if executor and next_url else None
+            if isinstance(data, dict):
+                data = [data]
+            yield from data or []
+            if not next_url:
+                return
+            data, next_url = pending.result() if pending else fetch_page(next_url, None)
+    finally:
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
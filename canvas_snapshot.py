@@ -0,0 +1,133 @@
+"""
+Snapshots dos dados do Canvas (cursos, módulos, calendário) em JSONL: um registro JSON por
+linha, identificado pelo id do Canvas.
+
+Cada gravação faz upsert pelo id (nunca duplica registros) ou substitui o conteúdo (replace,
+quando há remoções), é atômica (arquivo temporário + rename) e atualiza um manifesto com o número
+de registros e o hash de cada arquivo. Os arquivos mantêm a extensão .txt para continuarem
+aceitos pelo file_search da OpenAI.
+"""
+import os
+import json
+import hashlib
+import logging
+import tempfile
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+def manifest_path(directory):
+    return os.path.join(directory, ".manifest.json")
+
+def load_manifest(directory):
+    """ Manifesto dos snapshots: {"files": {nome: {"records", "sha256", "updated_at"}}}. """
+    try:
+        with open(manifest_path(directory)) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {"files": {}}
+    except (OSError, ValueError) as e:
+        logger.error(f"Falha ao ler o manifesto dos snapshots: {str(e)}")
+        return {"files": {}}
+    return manifest if "files" in manifest else {"files": {}}
+
+def save_manifest(manifest, directory):
+    """ Grava o manifesto de forma atômica (arquivo temporário + rename). """
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".manifest-")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, manifest_path(directory))
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def read_records(path):
+    """ Lê o snapshot registro a registro, sem carregar o arquivo inteiro. """
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+    except FileNotFoundError:
+        return
+
+def write_records(path, records, key="id"):
+    """
+    Grava os registros no snapshot de forma atômica, ordenados pela chave.
+
+    Returns:
+        dict: {"records": int, "sha256": str} do arquivo gravado.
+    """
+    digest = hashlib.sha256()
+    count = 0
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".snapshot-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for record in sorted(records, key=lambda record: record[key]):
+                line = json.dumps(record, ensure_ascii=False, sort_keys=True) + "\n"
+                f.write(line)
+                digest.update(line.encode("utf-8"))
+                count += 1
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return {"records": count, "sha256": digest.hexdigest()}
+
+def replace(path, records, key="id"):
+    """
+    Substitui o conteúdo do snapshot pelos registros (que podem incluir remoções) e atualiza
+    o manifesto.
+
+    Returns:
+        dict: Entrada do manifesto ({"records", "sha256", "updated_at"}) do arquivo.
+    """
+    entry = write_records(path, records, key)
+    entry["updated_at"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+    directory = os.path.dirname(os.path.abspath(path))
+    manifest = load_manifest(directory)
+    manifest["files"][os.path.basename(path)] = entry
+    save_manifest(manifest, directory)
+    return entry
+
+def upsert(path, records, key="id"):
+    """
+    Insere ou atualiza os registros no snapshot pelo id, sem duplicar os existentes.
+
+    Args:
+        path (str): Arquivo JSONL do snapshot.
+        records (iterable): Registros (dicts) vindos do Canvas.
+        key (str): Campo que identifica o registro.
+
+    Returns:
+        dict: Entrada do manifesto ({"records", "sha256", "updated_at"}) do arquivo.
+    """
+    current = {record[key]: record for record in read_records(path)}
+    inserted = updated = 0
+    for record in records:
+        previous = current.get(record[key])
+        if previous is None:
+            inserted += 1
+        elif previous != record:
+            updated += 1
+        current[record[key]] = record
+
+    if not inserted and not updated:
+        # Nada mudou: o arquivo e o manifesto ficam como estão, sem novo updated_at que dispare a
+        # sincronização do Vector Store
+        entry = load_manifest(os.path.dirname(os.path.abspath(path)))["files"].get(os.path.basename(path))
+        if entry is not None and os.path.exists(path):
+            logger.info(f"{os.path.basename(path)}: {entry['records']} registros (sem alterações)")
+            return entry
+
+    entry = replace(path, current.values(), key)
+    logger.info(
+        f"{os.path.basename(path)}: {entry['records']} registros "
+        f"({inserted} novos, {updated} atualizados)"
+    )
+    return entry
@@ -0,0 +1,77 @@
+import os
+import sys
+import logging
+import argparse
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "package"))
+
+import pgsql
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+COLUMNS = "username, message, chat_response, date"
+
+def connect():
+    return pgsql.Connection(
+        address=(os.getenv("DB_HOST"), 5432),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        database=os.getenv("DB_NAME"),
+        tls=False,
+    )
+
+def export_chat_history(path, start=None, end=None):
+    """
+    Exporta o histórico de conversas para um CSV via COPY TO STDOUT.
+
+    Args:
+        path (str): Arquivo CSV de destino.
+        start (date): Data inicial (inclusiva), opcional.
+        end (date): Data final (exclusiva), opcional.
+
+    Returns:
+        int: Número de linhas exportadas.
+    """
+    filters = []
+    # COPY não aceita parâmetros; as datas já chegam validadas como objetos date
+    if start:
+        filters.append(f"date >= '{start.isoformat()}'")
+    if end:
+        filters.append(f"date < '{end.isoformat()}'")
+    where = f" WHERE {' AND '.join(filters)}" if filters else ""
+
+    with connect() as db, open(path, "wb") as file:
+        count = db.copy_to(
+            f"COPY (SELECT {COLUMNS} FROM chat_history{where} ORDER BY date) TO STDOUT WITH (FORMAT csv, HEADER)",
+            file
+        )
+    # A primeira linha escrita é o cabeçalho
+    logger.info(f"{max(count - 1, 0)} mensagens exportadas para '{path}'")
+    return max(count - 1, 0)
+
+def import_chat_history(path):
+    """
+    Carrega um CSV exportado por export_chat_history na tabela chat_history via COPY FROM STDIN.
+
+    Returns:
+        int: Número de linhas importadas.
+    """
+    with connect() as db, open(path, "rb") as file:
+        count = db.copy_from(f"COPY chat_history ({COLUMNS}) FROM STDIN WITH (FORMAT csv, HEADER)", file)
+    logger.info(f"{count} mensagens importadas de '{path}'")
+    return count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Arquiva o histórico de conversas do chatbot")
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("path")
+    parser.add_argument("--start", type=date.fromisoformat)
+    parser.add_argument("--end", type=date.fromisoformat)
+    args = parser.parse_args()
+
+    if args.action == "export":
+        export_chat_history(args.path, args.start, args.end)
+    else:
+        import_chat_history(args.path)
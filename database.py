@@ -0,0 +1,244 @@
+import time
+import select
+import logging
+import threading
+from contextlib import contextmanager, asynccontextmanager
+
+import pgsql
+
+logger = logging.getLogger(__name__)
+
+CHAT_HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chat_history (
+    id SERIAL PRIMARY KEY,
+    username TEXT NOT NULL,
+    message TEXT NOT NULL,
+    chat_response TEXT NOT NULL,
+    date TIMESTAMP NOT NULL
+);
+"""
+
+INSERT_CHAT_HISTORY = """
+INSERT INTO chat_history (username, message, chat_response, date)
+VALUES ($1, $2, $3, $4)
+"""
+
+class PooledConnection:
+    """ Conexão do pool com cache de statements preparados. """
+
+    def __init__(self, db):
+        self.db = db
+        self.statements = {}
+        self.last_used = time.monotonic()
+
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+    def prepare(self, statement, dataclass=None, binary=False):
+        """ Prepara o statement apenas na primeira vez em que é usado nesta conexão. """
+        key = (statement, dataclass, binary)
+        if key not in self.statements:
+            self.statements[key] = self.db.prepare(statement, dataclass, binary)
+        return self.statements[key]
+
+    def close(self):
+        try:
+            self.db.close()
+        except Exception:
+            pass
+
+class Pool:
+    """
+    Pool de conexões pgsql.Connection reaproveitadas entre invocações.
+
+    Arguments:
+        size: Número máximo de conexões ociosas mantidas no pool.
+        setup: SQL executado uma única vez por processo, na primeira conexão (ex.: CREATE TABLE).
+        max_idle: Segundos de ociosidade após os quais a conexão é validada com um SELECT 1.
+        **connect_args: Argumentos repassados para pgsql.Connection.
+    """
+
+    def __init__(self, size=1, setup=None, max_idle=300, **connect_args):
+        self.size = size
+        self.setup = setup
+        self.max_idle = max_idle
+        self.connect_args = connect_args
+        self._idle = []
+        self._lock = threading.Lock()
+        self._setup_done = False
+
+    def _connect(self):
+        conn = PooledConnection(pgsql.Connection(**self.connect_args))
+        if self.setup and not self._setup_done:
+            conn.execute(self.setup)
+            self._setup_done = True
+        return conn
+
+    def _is_alive(self, conn):
+        # Uma conexão ociosa não deve ter nada para ler: dados aqui indicam EOF ou erro do servidor
+        try:
+            readable, _, _ = select.select([conn.db._sock], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        if readable:
+            return False
+        if time.monotonic() - conn.last_used > self.max_idle:
+            try:
+                conn.execute("SELECT 1")
+            except (OSError, EOFError, pgsql.Error, pgsql.Fatal):
+                return False
+        return True
+
+    def acquire(self):
+        """ Retorna uma conexão saudável do pool ou abre uma nova. """
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                return self._connect()
+            if self._is_alive(conn):
+                return conn
+            logger.info("Conexão ociosa inválida descartada do pool")
+            conn.close()
+
+    def release(self, conn):
+        """ Devolve a conexão ao pool (ou a fecha se o pool estiver cheio). """
+        conn.last_used = time.monotonic()
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    @contextmanager
+    def connection(self):
+        """
+        Empresta uma conexão em um bloco with. Em caso de erro de rede ou de sessão,
+        a conexão é descartada em vez de voltar ao pool.
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        except (OSError, EOFError, pgsql.Fatal, pgsql.Panic):
+            conn.close()
+            raise
+        except BaseException:
+            # Erros de statement deixam a sessão utilizável
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def close(self):
+        """ Fecha todas as conexões ociosas. """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+class AsyncPooledConnection(PooledConnection):
+    """ Conexão assíncrona do pool com cache de statements preparados. """
+
+    async def prepare(self, statement, dataclass=None, binary=False):
+        """ Prepara o statement apenas na primeira vez em que é usado nesta conexão. """
+        key = (statement, dataclass, binary)
+        if key not in self.statements:
+            self.statements[key] = await self.db.prepare(statement, dataclass, binary)
+        return self.statements[key]
+
+    async def close(self):
+        try:
+            await self.db.close()
+        except Exception:
+            pass
+
+class AsyncPool:
+    """
+    Pool de conexões pgsql.AsyncConnection para uso dentro do event loop (FastAPI).
+
+    Os argumentos são os mesmos de Pool, exceto size, que aqui limita também as conexões abertas:
+    com size conexões emprestadas, acquire espera uma delas voltar em vez de abrir outra. Cada
+    conexão é usada por uma tarefa de cada vez.
+    """
+
+    def __init__(self, size=5, setup=None, max_idle=300, **connect_args):
+        # Importado aqui, como em pgsql.AsyncConnection: a Lambda usa só o Pool e não paga o import do asyncio
+        import asyncio
+
+        self.size = size
+        self.setup = setup
+        self.max_idle = max_idle
+        self.connect_args = connect_args
+        self._idle = []
+        self._slots = asyncio.Semaphore(size)
+        self._setup_lock = asyncio.Lock()
+        self._setup_done = False
+
+    async def _connect(self):
+        conn = AsyncPooledConnection(await pgsql.AsyncConnection(**self.connect_args))
+        if self.setup and not self._setup_done:
+            async with self._setup_lock:
+                if not self._setup_done:
+                    await conn.execute(self.setup)
+                    self._setup_done = True
+        return conn
+
+    async def _is_alive(self, conn):
+        if conn.db._writer.is_closing() or conn.db._reader.at_eof():
+            return False
+        if time.monotonic() - conn.last_used > self.max_idle:
+            try:
+                await conn.execute("SELECT 1")
+            except (OSError, EOFError, pgsql.Error, pgsql.Fatal):
+                return False
+        return True
+
+    async def acquire(self):
+        """ Retorna uma conexão saudável do pool ou abre uma nova, esperando se o limite foi atingido. """
+        await self._slots.acquire()
+        try:
+            while self._idle:
+                conn = self._idle.pop()
+                if await self._is_alive(conn):
+                    return conn
+                logger.info("Conexão ociosa inválida descartada do pool")
+                await conn.close()
+            return await self._connect()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def release(self, conn):
+        """ Devolve a conexão ao pool. """
+        conn.last_used = time.monotonic()
+        self._idle.append(conn)
+        self._slots.release()
+
+    async def discard(self, conn):
+        """ Fecha a conexão emprestada, liberando a vaga para outra. """
+        try:
+            await conn.close()
+        finally:
+            self._slots.release()
+
+    @asynccontextmanager
+    async def connection(self):
+        """
+        Empresta uma conexão em um bloco async with. Ela só volta ao pool se o bloco terminar sem
+        erro: uma tarefa cancelada no meio de uma leitura deixa a resposta do servidor pela metade
+        no socket, e o próximo a usar a conexão a receberia.
+        """
+        conn = await self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            await self.discard(conn)
+            raise
+        else:
+            await self.release(conn)
+
+    async def close(self):
+        """ Fecha todas as conexões ociosas. """
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            await conn.close()
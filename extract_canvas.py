@@ -3,27 +3,51 @@ import logging
 import os
 from dotenv import load_dotenv
 
+import calendar_index
+import calendar_sync
+import canvas_client
+import canvas_snapshot
+
 # Load environment variables
 load_dotenv()
 TOKEN = os.getenv("TOKEN_CANVAS")
 canvas_api_url = os.getenv("CANVAS_API_URL")
 headers = {"Authorization": f"Bearer {TOKEN}"}
+# Máximo aceito pelo Canvas; as demais páginas são seguidas pelo cabeçalho Link
+PER_PAGE = 100
+
+# Snapshots JSONL (um registro por id) lidos pelo Vector Store e pela busca local
+OUTPUT_DIR = "./scraping"
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def fetch_page(url, params=None):
+    """ Busca uma página e retorna (dados, URL da próxima página segundo o cabeçalho Link). """
+    response = canvas_client.get(url, headers=headers, params=params)
+    response.raise_for_status()
+    return response.json(), response.links.get("next", {}).get("url")
+
 def make_request(endpoint, params=None):
     try:
-        url = f"{canvas_api_url}{endpoint}"
-        response = requests.get(
-            url, 
-            headers=headers, 
-            params=params,
-            timeout=30
-        )
-        response.raise_for_status()
-        return response.json()
+        return fetch_page(f"{canvas_api_url}{endpoint}", params)[0]
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Request failed: {str(e)}")
+        return None
+    except ValueError as e:
+        logger.error(f"Failed to parse response: {str(e)}")
+        return None
+
+def paginate(endpoint, params=None):
+    """ Gera todos os itens de um endpoint de listagem, página a página (ver canvas_client.paginate). """
+    params = {"per_page": PER_PAGE, **(params or {})}
+    return canvas_client.paginate(fetch_page, f"{canvas_api_url}{endpoint}", params)
+
+def list_all(endpoint, params=None):
+    """ Lista todas as páginas de um endpoint. Retorna None se alguma página falhar. """
+    try:
+        return list(paginate(endpoint, params))
     except requests.exceptions.RequestException as e:
         logger.error(f"Request failed: {str(e)}")
         return None
@@ -31,20 +55,32 @@ def make_request(endpoint, params=None):
         logger.error(f"Failed to parse response: {str(e)}")
         return None
 
+# Índice do snapshot local do calendário (ver get_calendar_index)
+_calendar_index = None
+
 def get_calendar():
-    return make_request("/api/v1/calendar_events", {"start_date": "2025-01-01", "end_date": "2025-12-31"})
+    return list_all("/api/v1/calendar_events", calendar_sync.calendar_params())
+
+def get_calendar_index():
+    """
+    Índice do calendário a partir do snapshot local (reconstruído apenas quando o arquivo muda)
+    ou, se ainda não houver snapshot, a partir do Canvas.
+    """
+    global _calendar_index
+    path = f"{OUTPUT_DIR}/calendar_data.txt"
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return calendar_index.CalendarIndex(get_calendar(), window=calendar_index.date_window(**calendar_sync.window_params()))
+    signature = (stat.st_mtime_ns, stat.st_size)
+    if _calendar_index is None or _calendar_index.signature != signature:
+        _calendar_index = calendar_index.CalendarIndex(canvas_snapshot.read_records(path))
+        _calendar_index.signature = signature
+    return _calendar_index
 
 def get_calendar_events(title_filter=None, date_filter=None):
     try:
-        events = get_calendar()
-        if not events:
-            return []
-        filtered_events = [
-            event for event in events
-            if (title_filter.lower() in event["title"].lower() if title_filter else True) and 
-               (date_filter in event["start_at"] if date_filter else True)
-        ]
-        return filtered_events
+        return get_calendar_index().search(title=title_filter, date=date_filter)
     except Exception as e:
         logger.error(f"Erro ao buscar eventos do calendário: {str(e)}")
         return []
@@ -54,19 +90,19 @@ def get_username():
     return user_data.get("name") if user_data else None
 
 def list_courses(params=None):
-    return make_request("/api/v1/courses", params)
+    return list_all("/api/v1/courses", params)
 
 def get_course_details(course_id, params=None):
     return make_request(f"/api/v1/courses/{course_id}", params)
 
 def list_modules(course_id, params=None):
-    return make_request(f"/api/v1/courses/{course_id}/modules", params)
+    return list_all(f"/api/v1/courses/{course_id}/modules", params)
 
 def list_module_items(course_id, module_id, params=None):
-    return make_request(f"/api/v1/courses/{course_id}/modules/{module_id}/items", params)
+    return list_all(f"/api/v1/courses/{course_id}/modules/{module_id}/items", params)
 
 def get_courses():
-    courses = list_courses(params={"per_page": 5})
+    courses = list_courses()
     
     if isinstance(courses, dict):  # Se for um único curso, converta para lista
         courses = [courses]
@@ -74,8 +110,12 @@ def get_courses():
 
 def get_all_modules(courses):
     all_modules = []
-    for course in courses:
-        course_modules = list_modules(course_id=course["id"], params={"per_page": 5})
+    # Uma requisição por curso, feitas em paralelo; os resultados mantêm a ordem dos cursos
+    results = canvas_client.fetch_all(
+        lambda course: list_modules(course_id=course["id"]),
+        courses
+    )
+    for course, course_modules in zip(courses, results):
         if course_modules:
             for module in course_modules:
                 module["course_name"] = course["name"]
@@ -83,22 +123,21 @@ def get_all_modules(courses):
     return all_modules
 
 def save_calendar_data():
-    calendar_data = get_calendar_events()
-    with open("./scraping/calendar_data.txt", "a") as file:
-        for event in calendar_data:
-            file.write(str(event))
+    # Só as páginas alteradas desde a última sincronização são baixadas (ver calendar_sync);
+    # em caso de erro o snapshot anterior é mantido
+    try:
+        calendar_sync.sync(f"{OUTPUT_DIR}/calendar_data.txt", f"{canvas_api_url}/api/v1/calendar_events", headers)
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logger.error(f"Erro ao buscar eventos do calendário: {str(e)}")
 
 def save_modules_data():
     courses = get_courses()
     modules_data = get_all_modules(courses)
-    with open("./scraping/modules_data.txt", "a") as file:
-        for module in modules_data:
-            file.write(f"Módulos: {str(module)}")
+    canvas_snapshot.upsert(f"{OUTPUT_DIR}/modules_data.txt", modules_data)
 
 def save_courses_data():
     courses_data = get_courses()
-    with open("./scraping/courses_data.txt", "a") as file:
-        file.write(f"Cursos: {str(courses_data)}")
+    canvas_snapshot.upsert(f"{OUTPUT_DIR}/courses_data.txt", courses_data)
 
 if __name__ == "__main__":
     save_calendar_data()
@@ -1,28 +1,369 @@
-import requests
+"""
+Crawler das páginas do site usadas como corpus (scraping/*.txt).
+
+As páginas são baixadas em paralelo com asyncio, com no máximo MAX_PER_HOST requisições
+simultâneas por host, e com requisições condicionais: o ETag e o Last-Modified de cada página
+ficam em scraping/.crawl_state.json e são reenviados como If-None-Match / If-Modified-Since.
+Páginas sem alteração voltam como 304, sem corpo, e seus arquivos não são tocados. Cada arquivo
+junta vários artigos: se algum mudou, os demais artigos do arquivo são baixados de novo para
+remontá-lo, o texto passa pela remoção de boilerplate e só é regravado se mudou.
+
+As URLs de PAGES são conferidas a cada execução com o sitemap do site (wp-sitemap.xml): as que
+ele não lista são ignoradas e as páginas publicadas que não estão em PAGES são relatadas no log.
+
+Uso:
+    python extract_data.py
+"""
+import os
+import json
+import time
+import asyncio
+import logging
+from collections import defaultdict
+from urllib.parse import urlsplit
+from xml.etree import ElementTree
+
+import httpx
 from bs4 import BeautifulSoup
 
-urls = [
-    "https://startfacens.edmais.tech/"
-]
+import boilerplate
+
+OUTPUT_DIR = "./scraping"
+# Requisições simultâneas por host: as páginas do corpus, todas no mesmo host, são verificadas
+# em poucas rodadas sem disparar todas de uma vez contra o site
+MAX_PER_HOST = int(os.getenv("CRAWLER_MAX_PER_HOST", "20"))
+TIMEOUT = float(os.getenv("CRAWLER_TIMEOUT", "30"))
+
+BASE_URL = "https://startfacens.edmais.tech/"
+# Sitemaps procurados em cada host, na ordem: o nativo do WordPress e o do Yoast
+SITEMAPS = ("wp-sitemap.xml", "sitemap_index.xml", "sitemap.xml")
+ARCHIVE_SITEMAPS = ("taxonomies", "category", "tag", "author", "users")
+# Páginas do corpus: arquivo gerado -> URLs dos artigos, na ordem em que são concatenados
+# (os slugs são os dos títulos dos artigos, "Título – Start Facens")
+PAGES = {
+    "aplicativos_facens.txt": [
+        f"{BASE_URL}acesso-ao-aplicativo-canvas-student/",
+        f"{BASE_URL}acesso-ao-aplicativo-facens/",
+    ],
+    "aulas_virtuais.txt": [
+        f"{BASE_URL}acessando-a-aula-do-teams-pelo-aplicativo-mobile/",
+        f"{BASE_URL}acessando-a-aula-do-teams-pelo-navegador/",
+        f"{BASE_URL}como-acessar-as-aulas-virtuais/",
+        f"{BASE_URL}como-ativar-legendas-ao-vivo-no-teams/",
+        f"{BASE_URL}compartilhando-a-tela-no-teams/",
+        f"{BASE_URL}instalando-e-utilizando-o-teams-no-computador/",
+    ],
+    "ava.txt": [
+        f"{BASE_URL}acesso-ao-forum/",
+        f"{BASE_URL}como-acessar-componentes-curriculares-passados/",
+        f"{BASE_URL}como-enviar-uma-atividade-ou-tarefa/",
+        f"{BASE_URL}como-favoritar-os-componentes-curriculares-no-canvas/",
+        f"{BASE_URL}componentes-curriculares-nao-publicados-no-canvas/",
+    ],
+    "biblioteca.txt": [
+        f"{BASE_URL}abnt-online/",
+        f"{BASE_URL}acervo-internacional-na-biblioteca-facens/",
+        f"{BASE_URL}achados-e-perdidos-biblioteca/",
+        f"{BASE_URL}atendimento-biblioteca/",
+        f"{BASE_URL}banner-para-congresso/",
+        f"{BASE_URL}citacoes/",
+        f"{BASE_URL}elibraryusa/",
+        f"{BASE_URL}ferramentas-para-normatizacao-de-referencias/",
+        f"{BASE_URL}ficha-catalografica/",
+        f"{BASE_URL}informacoes-gerais-biblioteca/",
+        f"{BASE_URL}manual-de-textos-tecnicos/",
+        f"{BASE_URL}modelo-de-artigo/",
+        f"{BASE_URL}modelo-tcc-word/",
+        f"{BASE_URL}perguntas-frequentes-biblioteca/",
+        f"{BASE_URL}revistas-digitais/",
+        f"{BASE_URL}submissao-de-tcc-monografia/",
+        f"{BASE_URL}submissao-de-upx/",
+        f"{BASE_URL}termo-de-disponibilizacao-tcc-monografia/",
+        f"{BASE_URL}treinamentos-biblioteca/",
+    ],
+    "calendario.txt": [
+        f"{BASE_URL}calendario-academico/",
+        f"{BASE_URL}horario-das-aulas-graduacao/",
+    ],
+    "estagio.txt": [
+        f"{BASE_URL}alumni-facens/",
+        f"{BASE_URL}carreiras-estagio/",
+    ],
+    "financeiro.txt": [
+        f"{BASE_URL}boletos-e-pagamentos/",
+        f"{BASE_URL}bolsas-e-financiamentos/",
+        f"{BASE_URL}negociacao-online/",
+    ],
+    "impressões.txt": [f"{BASE_URL}impressao-pelo-celular-computador/"],
+    "lab_informatica.txt": [
+        f"{BASE_URL}como-conectar-ao-wi-fi-alunos/",
+        f"{BASE_URL}como-limpar-o-cache-do-navegador/",
+        f"{BASE_URL}convenios-de-software-para-estudantes/",
+        f"{BASE_URL}informacoes-aos-alunos-laboratorio-de-informatica/",
+        f"{BASE_URL}redefinicao-de-senha-acessos-facens/",
+        f"{BASE_URL}regulamento-do-laboratorio-de-informatica-li/",
+    ],
+    "labs.txt": [
+        f"{BASE_URL}fablab/",
+        f"{BASE_URL}liga-facens/",
+        f"{BASE_URL}lince-laboratorio-de-inovacao-e-competicoes-estudantis/",
+        f"{BASE_URL}lis-laboratorio-de-inovacao-social/",
+        f"{BASE_URL}smart-campus-facens/",
+    ],
+    "main_page.txt": [BASE_URL],
+    "portal_academico.txt": [
+        f"{BASE_URL}acompanhar-solicitacao-protocolo-portal-academico/",
+        f"{BASE_URL}aproveitamento-de-estudos/",
+        f"{BASE_URL}declaracao-de-matricula-portal-academico/",
+        f"{BASE_URL}portal-academico/",
+        f"{BASE_URL}sistema-de-avaliacao/",
+    ],
+    "rematricula.txt": [
+        f"{BASE_URL}como-fazer-a-sua-rematricula/",
+        f"{BASE_URL}protocolo-turmas-especiais/",
+        f"{BASE_URL}protocolos-de-rematricula/",
+    ],
+    "saiba_mais_facens.txt": [
+        f"{BASE_URL}blog-facens/",
+        f"{BASE_URL}cpa-comissao-propria-de-avaliacao/",
+        f"{BASE_URL}dri-departamento-de-relacoes-internacionais/",
+        f"{BASE_URL}enlace/",
+        f"{BASE_URL}face-facens-centro-de-empreendedorismo/",
+        f"{BASE_URL}industria-4-0/",
+        f"{BASE_URL}ipfacens/",
+        f"{BASE_URL}ncursos/",
+        f"{BASE_URL}ouvidoria/",
+        f"{BASE_URL}smart-mall-facens/",
+        f"{BASE_URL}sustentabilidade-facens/",
+    ],
+}
 
 # Cabeçalho com User-Agent para simular um navegador real
 headers = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/112.0.0.0 Safari/537.36"
 }
 
-for url in urls:
-    # Fazer a requisição com o cabeçalho
-    response = requests.get(url, headers=headers)
+logger = logging.getLogger(__name__)
+
+def state_path(directory=OUTPUT_DIR):
+    return os.path.join(directory, ".crawl_state.json")
+
+def load_state(directory=OUTPUT_DIR):
+    """ Validadores da última execução: {url: {"etag": str, "last_modified": str}}. """
+    try:
+        with open(state_path(directory)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.error(f"Falha ao ler o estado do crawler: {str(e)}")
+        return {}
+
+def page_text(html):
+    """ Extrai apenas o texto visível da página. """
+    return BeautifulSoup(html, "html.parser").get_text(separator="\n", strip=True)
+
+async def fetch(client, limits, url, validators):
+    """ GET condicional, limitado pelo semáforo do host. """
+    request_headers = dict(headers)
+    if validators.get("etag"):
+        request_headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        request_headers["If-Modified-Since"] = validators["last_modified"]
+    async with limits[urlsplit(url).netloc]:
+        return await client.get(url, headers=request_headers)
+
+def _normalized(url):
+    """ Chave de comparação entre as URLs do sitemap e as de PAGES (sem esquema nem barra final). """
+    parts = urlsplit(url)
+    return parts.netloc.lower() + parts.path.rstrip("/")
+
+async def _sitemap_urls(client, limits, url, depth=0):
+    """ URLs listadas no sitemap em url, seguindo os sitemaps de posts e páginas de um índice. """
+    async with limits[urlsplit(url).netloc]:
+        response = await client.get(url, headers=headers)
+    response.raise_for_status()
+    root = ElementTree.fromstring(response.content)
+    locations = [element.text.strip() for element in root.iter() if element.tag.endswith("loc") and element.text]
+    if not root.tag.endswith("sitemapindex"):
+        return set(locations)
+    # Os sitemaps de categorias, tags e autores não trazem artigos
+    nested = [
+        location for location in locations
+        if depth < 2 and not any(kind in location.rsplit("/", 1)[-1] for kind in ARCHIVE_SITEMAPS)
+    ]
+    found = await asyncio.gather(*(_sitemap_urls(client, limits, location, depth + 1) for location in nested))
+    return set().union(*found)
+
+async def discover(client, limits, hosts):
+    """
+    URLs publicadas pelo site segundo o sitemap de cada host (o do WordPress ou o do Yoast).
+
+    Returns:
+        dict | None: {URL normalizada (_normalized): URL}; None se nenhum host tiver sitemap.
+    """
+    published, found = {}, False
+    for host in hosts:
+        for name in SITEMAPS:
+            try:
+                urls = await _sitemap_urls(client, limits, host + name)
+            except (httpx.HTTPError, ElementTree.ParseError):
+                continue
+            published.update((_normalized(url), url) for url in urls)
+            found = True
+            break
+        else:
+            logger.warning(f"Nenhum sitemap encontrado em {host}; as URLs de PAGES não serão verificadas")
+    return published if found else None
+
+def _failure(response):
+    """ None se a resposta é 200 ou 304; senão a descrição do erro. """
+    if isinstance(response, Exception):
+        return str(response) or type(response).__name__
+    if response.status_code not in (200, 304):
+        return f"HTTP {response.status_code}"
+    return None
+
+async def crawl(pages=PAGES, directory=OUTPUT_DIR, max_per_host=MAX_PER_HOST):
+    """
+    Atualiza os arquivos do corpus a partir das páginas.
+
+    As URLs de PAGES são conferidas com o sitemap do site: as que ele não lista não são baixadas
+    e as que ele lista sem estarem em PAGES são apenas relatadas. Um arquivo é remontado com os
+    artigos que foram baixados quando algum deles mudou ou saiu do site (404/410, ou fora do
+    sitemap); os artigos que falharam ficam de fora, sem validadores, e voltam na próxima
+    execução. As URLs com falha são registradas no log e devolvidas em "failed".
+
+    Args:
+        pages (dict): {arquivo: [URLs]}.
+        directory (str): Diretório do corpus.
+
+    Returns:
+        dict: {"pages", "not_modified", "refetched", "written", "errors", "bytes", "seconds",
+               "failed": {URL: erro}, "unlisted": [URLs], "unassigned": [URLs]}
+    """
+    started = time.perf_counter()
+    state = load_state(directory)
+    limits = defaultdict(lambda: asyncio.Semaphore(max_per_host))
+    summary = {
+        "pages": 0, "not_modified": 0, "refetched": 0, "written": 0, "errors": 0, "bytes": 0,
+        "failed": {}, "unlisted": [], "unassigned": [],
+    }
+    # Artigos fora do site: saem do arquivo, que é remontado se os incluía
+    gone = set()
+
+    async with httpx.AsyncClient(timeout=TIMEOUT, follow_redirects=True) as client:
+        hosts = sorted({f"{urlsplit(url).scheme}://{urlsplit(url).netloc}/" for urls in pages.values() for url in urls})
+        published = await discover(client, limits, hosts)
+        if published is not None:
+            registered = {_normalized(url) for urls in pages.values() for url in urls}
+            home = {_normalized(host) for host in hosts}
+            summary["unlisted"] = [
+                url for urls in pages.values() for url in urls
+                if _normalized(url) not in published and _normalized(url) not in home
+            ]
+            summary["unassigned"] = sorted(published[key] for key in published.keys() - registered - home)
+            for url in summary["unlisted"]:
+                logger.warning(f"{url} não está no sitemap do site e foi ignorada")
+            if summary["unassigned"]:
+                logger.warning(
+                    f"{len(summary['unassigned'])} páginas do sitemap não estão em PAGES: "
+                    + ", ".join(summary["unassigned"])
+                )
+            gone.update(summary["unlisted"])
+
+        # Sem o arquivo gerado, as páginas são baixadas por inteiro mesmo que não tenham mudado
+        targets = [
+            (name, url, state.get(url, {}) if os.path.exists(os.path.join(directory, name)) else {})
+            for name, urls in pages.items() for url in urls if url not in gone
+        ]
+        summary["pages"] = len(targets)
+        results = defaultdict(dict)
+
+        def collect(pending, responses):
+            for (name, url), response in zip(pending, responses):
+                if not isinstance(response, Exception):
+                    summary["bytes"] += response.num_bytes_downloaded
+                error = _failure(response)
+                if error is None:
+                    results[name][url] = response
+                    continue
+                logger.error(f"Erro ao acessar o site {url}: {error}")
+                summary["errors"] += 1
+                summary["failed"][url] = error
+                if not isinstance(response, Exception) and response.status_code in (404, 410):
+                    gone.add(url)
+
+        responses = await asyncio.gather(
+            *(fetch(client, limits, url, validators) for _, url, validators in targets),
+            return_exceptions=True,
+        )
+        collect([(name, url) for name, url, _ in targets], responses)
+        summary["not_modified"] = sum(
+            response.status_code == 304 for name in results for response in results[name].values()
+        )
 
-    if response.status_code == 200:
-        # Criar um objeto BeautifulSoup para analisar o HTML
-        soup = BeautifulSoup(response.text, "html.parser")
+        changed = [
+            name for name in pages
+            if any(response.status_code == 200 for response in results[name].values())
+            or any(url in gone and url in state for url in pages[name])
+        ]
+        # O 304 não traz o corpo: as páginas sem alteração dos arquivos a remontar são baixadas de novo
+        missing = [
+            (name, url) for name in changed for url in pages[name]
+            if url in results[name] and results[name][url].status_code == 304
+        ]
+        summary["refetched"] = len(missing)
+        for name, url in missing:
+            del results[name][url]
+        responses = await asyncio.gather(
+            *(fetch(client, limits, url, {}) for _, url in missing),
+            return_exceptions=True,
+        )
+        collect(missing, responses)
 
-        # Extrair apenas o texto visível
-        page_text = soup.get_text(separator="\n", strip=True)
+    texts = {
+        name: "\n".join(page_text(results[name][url].text) for url in pages[name] if url in results[name])
+        for name in changed if any(response.status_code == 200 for response in results[name].values())
+    }
+    if texts:
+        # Remove menus, sumários e demais blocos repetidos entre as páginas antes de gravar; o
+        # corpus gravado já está limpo, então a referência é o boilerplate salvo
+        known = boilerplate.load_boilerplate(directory)
+        cleaned, learned = boilerplate.clean_documents(texts, known, total=len(pages))
+        if learned != known:
+            boilerplate.save_boilerplate(learned, directory)
+        for name, text in cleaned.items():
+            for url in pages[name]:
+                # Artigo deixado de fora: sem validadores, é baixado por inteiro na próxima execução
+                # e, se voltar, o arquivo é remontado com ele
+                state.pop(url, None)
+            for url, response in results[name].items():
+                state[url] = {
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                }
+            path = os.path.join(directory, name)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    if f.read() == text:
+                        continue
+            except FileNotFoundError:
+                pass
+            boilerplate.write_atomic(path, text)
+            summary["written"] += 1
+        boilerplate.write_atomic(state_path(directory), json.dumps(state, indent=2))
 
-        with open("./scraping/main_page.txt", "a") as file:
-            file.write(page_text)
+    summary["seconds"] = time.perf_counter() - started
+    logger.info(
+        f"{summary['pages']} páginas em {summary['seconds']:.2f}s: {summary['not_modified']} sem alteração, "
+        f"{summary['refetched']} baixadas de novo, {summary['written']} arquivos regravados, "
+        f"{summary['errors']} erros, {summary['bytes'] / 1024:.1f} KB"
+    )
+    if summary["failed"]:
+        logger.warning("Páginas com falha: " + ", ".join(f"{url} ({error})" for url, error in summary["failed"].items()))
+    return summary
 
-    else:
-        print(f"Erro ao acessar o site {url}: \n{response.status_code}")
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(crawl())
@@ -1,13 +1,16 @@
 import os
+import time
 from openai import OpenAI
 
+import vector_store
+
 client = OpenAI()
 
 def get_files(path = "./scraping"):
     files =  os.listdir(path)
     file_paths = []
     for f in files:
-        if os.path.isfile(path + '/' + f):
+        if os.path.isfile(path + '/' + f) and not f.startswith('.'):
             file_paths.append(path + '/' + f)
     return file_paths
 
@@ -38,48 +41,56 @@ def assistant(client):
 
 
 def data_batch_and_inference(assistant_id):
-    vector_store = client.beta.vector_stores.create(name = "Facens")
-    print(f"Vector Store ID = {vector_store.id}")
-    
     file_paths = get_files()
-    files_streams = [open(file_path, "rb") for file_path in file_paths]
-
-
-    file_batch = client.beta.vector_stores.file_batches.upload_and_poll(
-        vector_store_id = vector_store.id,
-        files = files_streams 
-    )
+    vector_store_id = vector_store.sync_vector_store(client, file_paths)
+    print(f"Vector Store ID = {vector_store_id}")
 
-    print(f"File Batch Status {file_batch.status}")
+    if not vector_store_id:
+        print("Falha ao sincronizar o Vector Store")
+        return
 
     assistant = client.beta.assistants.update(
         assistant_id=assistant_id, 
-        tool_resources= {"file_search": {"vector_store_ids": [vector_store.id]}}, 
+        tool_resources= {"file_search": {"vector_store_ids": [vector_store_id]}}, 
     )
 
     print("Assistant Updated with vector store!")
 
-    thread = client.beta.threads.create()
-    print(f"Your thread id is - {thread.id}\n\n")
+    # A thread é criada junto com o primeiro run (create_and_run_stream) e reaproveitada nos seguintes
+    thread_id = None
 
     while True:
         text = input("O que deseja procurar?\n")
+        started = time.perf_counter()
+        first_token = None
+
+        # Mensagem e run em uma única requisição; o texto é impresso à medida que é gerado
+        if thread_id is None:
+            stream_manager = client.beta.threads.create_and_run_stream(
+                assistant_id = assistant.id,
+                thread = {"messages": [{"role": "user", "content": text}]},
+            )
+        else:
+            stream_manager = client.beta.threads.runs.stream(
+                thread_id = thread_id,
+                assistant_id = assistant.id,
+                additional_messages = [{"role": "user", "content": text}],
+            )
 
-        message = client.beta.threads.messages.create(
-            thread_id = thread.id,
-            role = "user",
-            content = text,
-        )
-
-        run = client.beta.threads.runs.create_and_poll(
-            thread_id = thread.id,
-            assistant_id = assistant.id 
-        )
-
-        messages = list(client.beta.threads.messages.list(thread_id = thread.id, run_id = run.id))
-        message_content = messages[0].content[0].text
         print("Response: \n")
-        print(f"{message_content.value}\n")
+        with stream_manager as stream:
+            for delta in stream.text_deltas:
+                if first_token is None:
+                    first_token = time.perf_counter() - started
+                print(delta, end = "", flush = True)
+            run = stream.current_run
+
+        if thread_id is None and run:
+            thread_id = run.thread_id
+            print(f"\n\nYour thread id is - {thread_id}")
+        if first_token is None:
+            first_token = time.perf_counter() - started
+        print(f"\n\n[primeiro token: {first_token * 1000:.0f} ms, total: {(time.perf_counter() - started) * 1000:.0f} ms]\n")
 
 if __name__ == '__main__':
     #assistant = assistant(client)
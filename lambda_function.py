@@ -1,12 +1,12 @@
 import os
 import json
-from openai import OpenAI
-import pgsql
+import time
 from datetime import datetime
 import logging
-import requests
 
-client = OpenAI()
+import vector_store
+import canvas_client
+
 logger = logging.getLogger(__name__)
 
 user_name = os.getenv("DB_USER")
@@ -15,8 +15,40 @@ rds_proxy_host = os.getenv("DB_HOST")
 db_name = os.getenv("DB_NAME")
 canvas_api_url = os.getenv("CANVAS_API_URL")
 TOKEN = os.getenv("TOKEN_CANVAS")
+# "assistants" (file_search hospedado na OpenAI) ou "bm25" (busca local + chat.completions)
+RETRIEVAL_ENGINE = os.getenv("RETRIEVAL_ENGINE", "assistants")
 headers = {"Authorization": f"Bearer {TOKEN}"}
 
+# Inicializados sob demanda e reaproveitados entre invocações "quentes" da Lambda
+_client = None
+_username = None
+_pool = None
+_answer_cache = None
+
+def get_client():
+    """ Cria o cliente OpenAI na primeira chamada e o reutiliza nas seguintes. """
+    global _client
+    if _client is None:
+        from openai import OpenAI
+        _client = OpenAI()
+    return _client
+
+def get_answer_cache():
+    """
+    Cria o cache semântico de respostas na primeira chamada; ele vive enquanto a Lambda estiver "quente".
+    Retorna None (sem cache) se o NumPy não estiver disponível no pacote.
+    """
+    global _answer_cache
+    if _answer_cache is None:
+        try:
+            import semantic_cache
+        except ImportError as e:
+            logger.warning(f"Cache semântico desativado: {str(e)}")
+            _answer_cache = False
+        else:
+            _answer_cache = semantic_cache.SemanticCache(semantic_cache.openai_embedder(get_client()))
+    return _answer_cache or None
+
 def get_files(path="./scraping"):
     """ Obtém os arquivos do diretório fornecido. """
     if not os.path.exists(path):
@@ -25,7 +57,8 @@ def get_files(path="./scraping"):
     file_paths = []
     for f in os.listdir(path):
         full_path = os.path.join(path, f)
-        if os.path.isfile(full_path):
+        # Arquivos ocultos (ex.: o manifesto dos snapshots do Canvas) não fazem parte do corpus
+        if os.path.isfile(full_path) and not f.startswith("."):
             file_paths.append(full_path)
     return file_paths
 
@@ -40,7 +73,7 @@ def create_assistant():
     Se não encontrar a informação necessária nos documentos, informe educadamente ao usuário que não pode ajudá-lo.
     """
 
-    assistant = client.beta.assistants.create(
+    assistant = get_client().beta.assistants.create(
         name="Educational Assistant",
         description=description,
         instructions=instructions,
@@ -50,97 +83,86 @@ def create_assistant():
 
     return assistant.id
 
-def insert_chat_history(username: str, message: str, chat_response: str):
-    date = datetime.now()
-    try:
-        with pgsql.Connection(
+def get_pool():
+    """ Cria o pool de conexões na primeira chamada; a tabela é criada uma única vez por processo. """
+    global _pool
+    if _pool is None:
+        import database
+        _pool = database.Pool(
+            setup=database.CHAT_HISTORY_SCHEMA,
             address=(rds_proxy_host, 5432),
             user=user_name,
             password=password,
             database=db_name,
             tls=False,
-        ) as db:
-            insert_query = """
-            INSERT INTO chat_history (username, message, chat_response, date)
-            VALUES ($1, $2, $3, $4)
-            """
-            db.execute(
-                """
-                CREATE TABLE IF NOT EXISTS chat_history (
-                    id SERIAL PRIMARY KEY,
-                    username TEXT NOT NULL,
-                    message TEXT NOT NULL,
-                    chat_response TEXT NOT NULL,
-                    date TIMESTAMP NOT NULL
-                );
-                """
-            )
-            with db.prepare(insert_query) as insert_message:
-                insert_message(username, message, chat_response, date)
-                logger.info("Mensagem inserida com sucesso")
+        )
+    return _pool
+
+def insert_chat_history(username: str, message: str, chat_response: str):
+    date = datetime.now()
+    try:
+        import database
+        with get_pool().connection() as db:
+            db.prepare(database.INSERT_CHAT_HISTORY)(username, message, chat_response, date)
+            logger.info("Mensagem inserida com sucesso")
     except Exception as e:
         logger.error(f"Erro ao inserir mensagem no banco: {str(e)}")
 
+# Vector Store atualmente associado a cada assistente neste processo
+_assistant_vector_stores = {}
+
 def process_files_and_run_assistant(assistant_id, query):
-    """ Faz o upload dos arquivos e executa a pesquisa no assistente OpenAI. """
-    
-    # Criando um Vector Store
-    vector_store = client.beta.vector_stores.create(name="Facens_VectorStore")
+    """ Garante o Vector Store do corpus atual e executa a pesquisa no assistente OpenAI. """
+    client = get_client()
+    timings = {}
+    started = time.perf_counter()
     
     file_paths = get_files()
     if not file_paths:
         return {"error": "Nenhum arquivo encontrado para upload."}
-    
-    files_streams = [open(file_path, "rb") for file_path in file_paths]
 
-    file_batch = client.beta.vector_stores.file_batches.upload_and_poll(
-        vector_store_id=vector_store.id,
-        files=files_streams 
-    )
-
-    if file_batch.status != "completed":
+    # Reutiliza o Vector Store já indexado para o conteúdo atual do corpus
+    vector_store_id = vector_store.get_or_create_vector_store(client, file_paths)
+    if not vector_store_id:
         return {"error": "Falha ao processar arquivos no Vector Store."}
+    timings["vector_store"] = time.perf_counter() - started
 
-    # Atualizando o assistente para usar o Vector Store
-    assistant = client.beta.assistants.update(
-        assistant_id=assistant_id,
-        tool_resources={"file_search": {"vector_store_ids": [vector_store.id]}},
-    )
-
-    # Criando uma thread para a interação
-    thread = client.beta.threads.create()
-
-    # Enviando a consulta do usuário
-    message = client.beta.threads.messages.create(
-        thread_id=thread.id,
-        role="user",
-        content=query,
-    )
-
-    # Executando a consulta
-    run = client.beta.threads.runs.create_and_poll(
-        thread_id=thread.id,
-        assistant_id=assistant.id
-    )
-
-    # Obtendo a resposta do assistente
-    messages = list(client.beta.threads.messages.list(thread_id=thread.id, run_id=run.id))
-    
-    if messages:
-        response_content = messages[0].content[0].text
-        return {"response": response_content.value}
+    # Atualizando o assistente apenas quando o Vector Store mudou
+    if _assistant_vector_stores.get(assistant_id) != vector_store_id:
+        client.beta.assistants.update(
+            assistant_id=assistant_id,
+            tool_resources={"file_search": {"vector_store_ids": [vector_store_id]}},
+        )
+        _assistant_vector_stores[assistant_id] = vector_store_id
+    timings["assistente"] = time.perf_counter() - started
 
+    # Cria a thread com a mensagem e executa o run em uma única requisição, recebendo o texto
+    # por streaming (sem o intervalo de polling de create_and_poll nem um messages.list separado)
+    parts = []
+    with client.beta.threads.create_and_run_stream(
+        assistant_id=assistant_id,
+        thread={"messages": [{"role": "user", "content": query}]},
+    ) as stream:
+        for text in stream.text_deltas:
+            if not parts:
+                timings["primeiro_token"] = time.perf_counter() - started
+            parts.append(text)
+        run = stream.current_run
+    timings["resposta"] = time.perf_counter() - started
+
+    logger.info("Latência por etapa (acumulada): " + ", ".join(f"{stage}={seconds * 1000:.0f}ms" for stage, seconds in timings.items()))
+
+    if parts:
+        return {"response": "".join(parts)}
+
+    if run and run.status != "completed":
+        logger.error(f"Run {run.id} terminou com status {run.status}: {run.last_error}")
     return {"error": "Nenhuma resposta encontrada."}
 
 def make_request(endpoint, params=None):
+    import requests
     try:
-        url = f"{canvas_api_url}{endpoint}"
-        response = requests.get(
-            url, 
-            headers=headers, 
-            params=params,
-            timeout=30
-        )
+        response = canvas_client.get(f"{canvas_api_url}{endpoint}", headers=headers, params=params)
         response.raise_for_status()
         return response.json()
     except requests.exceptions.RequestException as e:
@@ -151,10 +173,12 @@ def make_request(endpoint, params=None):
         return None
 
 def get_username():
-    user_data = make_request("/users/self")
-    return user_data.get("name") if user_data else None
-
-username = get_username()
+    """ Busca o nome do usuário no Canvas na primeira chamada e o memoriza. """
+    global _username
+    if _username is None:
+        user_data = make_request("/users/self")
+        _username = user_data.get("name") if user_data else None
+    return _username
 
 def handler(event, context):
     """ Função principal para ser executada na AWS Lambda. """
@@ -172,10 +196,23 @@ def handler(event, context):
     # ID do assistente, pode ser gerado uma vez e armazenado
     assistant_id = "asst_VWFEqFIlOolIqD5OxQZSbLT1"
 
-    # Processa os arquivos e executa a pesquisa no assistente
-    response_data = process_files_and_run_assistant(assistant_id, query)
-
-    insert_chat_history(username=username, message=query, chat_response=response_data)
+    # Perguntas já respondidas (ou semelhantes) com o corpus atual vêm do cache semântico
+    cache = get_answer_cache()
+    corpus = vector_store.corpus_version(get_files())
+    response_data, vector = cache.lookup(query, assistant_id, corpus) if cache else (None, None)
+
+    if response_data is None:
+        if RETRIEVAL_ENGINE == "bm25":
+            # Busca local no corpus, sem Vector Store nem Assistants API
+            import retrieval
+            response_data = retrieval.answer(get_client(), query)
+        else:
+            # Processa os arquivos e executa a pesquisa no assistente
+            response_data = process_files_and_run_assistant(assistant_id, query)
+        if cache and "response" in response_data:
+            cache.store(query, response_data, assistant_id, corpus, vector)
+
+    insert_chat_history(username=get_username(), message=query, chat_response=response_data)
 
     return {
         "statusCode": 200,
@@ -18,9 +18,13 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 # THE SOFTWARE.
 
-from struct import unpack
+from struct import unpack, unpack_from
 from operator import methodcaller
 from dataclasses import make_dataclass
+from datetime import date, datetime, time, timedelta, timezone
+from json import loads
+from math import prod
+from uuid import UUID
 
 types = {
     16:     lambda x: x == b"t",    # bool
@@ -35,6 +39,105 @@ types = {
 
 _UTF_8 = methodcaller("decode")
 
+_EPOCH_DATE = date(2000, 1, 1)
+_EPOCH = datetime(2000, 1, 1)
+_EPOCH_TZ = datetime(2000, 1, 1, tzinfo = timezone.utc)
+_INFINITY = 0x7fffffffffffffff
+
+def _unpack(fmt):
+    return lambda x: unpack_from(fmt, x)[0]
+
+def _date(x):
+    days = unpack_from("!i", x)[0]
+    if days == 0x7fffffff:
+        return date.max
+    if days == -0x80000000:
+        return date.min
+    return _EPOCH_DATE + timedelta(days = days)
+
+def _timestamp(epoch, maximum, minimum):
+    def timestamp(x):
+        microseconds = unpack_from("!q", x)[0]
+        if microseconds == _INFINITY:
+            return maximum
+        if microseconds == -_INFINITY - 1:
+            return minimum
+        return epoch + timedelta(microseconds = microseconds)
+    return timestamp
+
+def _time(x):
+    seconds, microseconds = divmod(unpack_from("!q", x)[0], 1000000)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return time(hours, minutes, seconds, microseconds)
+
+def _text(x):
+    return str(x, "utf-8")
+
+def _array(decode):
+    def array(x):
+        ndim = unpack_from("!i", x)[0]
+        if ndim == 0:
+            return []
+        dims = [unpack_from("!i", x, 12 + 8 * d)[0] for d in range(ndim)]
+        i = 12 + 8 * ndim
+        values = []
+        for n in range(prod(dims)):
+            size = unpack_from("!i", x, i)[0]
+            i += 4
+            if size == -1:
+                values.append(None)
+            else:
+                values.append(decode(x[i:i + size]))
+                i += size
+        for size in reversed(dims[1:]):
+            values = [values[j:j + size] for j in range(0, len(values), size)]
+        return values
+    return array
+
+# Decoders for the binary result format. They receive a memoryview of the column.
+# Columns of other types are transferred in text format and decoded with types.
+binary_types = {
+    16:     lambda x: x[0] == 1,    # bool
+    17:     bytes,                  # bytea
+    19:     _text,                  # name
+    20:     _unpack("!q"),             # int8
+    21:     _unpack("!h"),             # int2
+    23:     _unpack("!i"),             # int4
+    25:     _text,                  # text
+    26:     _unpack("!I"),             # oid
+    114:    lambda x: loads(_text(x)), # json
+    700:    _unpack("!f"),             # float4
+    701:    _unpack("!d"),             # float8
+    1042:   _text,                  # bpchar
+    1043:   _text,                  # varchar
+    1082:   _date,                  # date
+    1083:   _time,                  # time
+    1114:   _timestamp(_EPOCH, datetime.max, datetime.min), # timestamp
+    1184:   _timestamp(
+                _EPOCH_TZ,
+                datetime.max.replace(tzinfo = timezone.utc),
+                datetime.min.replace(tzinfo = timezone.utc)
+            ),                      # timestamptz
+    2950:   lambda x: UUID(bytes = bytes(x)), # uuid
+    3802:   lambda x: loads(_text(x[1:])), # jsonb (version byte + text)
+}
+binary_types.update({
+    array_oid: _array(binary_types[element_oid]) for array_oid, element_oid in (
+        (1000, 16),     # bool[]
+        (1005, 21),     # int2[]
+        (1007, 23),     # int4[]
+        (1009, 25),     # text[]
+        (1015, 1043),   # varchar[]
+        (1016, 20),     # int8[]
+        (1022, 701),    # float8[]
+        (1115, 1114),   # timestamp[]
+        (1182, 1082),   # date[]
+        (2951, 2950),   # uuid[]
+        (3807, 3802),   # jsonb[]
+    )
+})
+
 def _authentication_request(data):
     return int.from_bytes(data[:4], signed = True), data[4:]
 
@@ -51,13 +154,15 @@ def _row_description(data):
     data = data[2:]
     field_names = []
     field_types = []
+    field_oids = []
     for i in range(count):
         name, data = data.split(b"\x00", 1)
         desc = unpack("!ihihih", data[:18])
         data = data[18:]
         field_names.append(f"_{i}" if name[0] == 63 else name.decode().replace(" ", "_"))
         field_types.append(types.get(desc[2], _UTF_8))
-    return field_names, field_types
+        field_oids.append(desc[2])
+    return field_names, field_types, field_oids
 
 class _DataRow(bytes):
     def __call__(self, types):
@@ -72,36 +177,144 @@ class _DataRow(bytes):
                 yield types[n](self[i:i + size])
                 i += size
 
-class Statement:
-    def __init__(self, connection, statement, named, dataclass):
+    def view(self, types):
+        # Binary-format rows: columns are sliced from a memoryview without copying
+        data = memoryview(self)
+        count = unpack_from("!h", data)[0]
+        i = 2
+        for n in range(count):
+            size = unpack_from("!i", data, i)[0]
+            i += 4
+            if size == -1:
+                yield None
+            else:
+                yield types[n](data[i:i + size])
+                i += size
+
+class _CopyData(bytes):
+    pass
+
+class _CommandComplete(bytes):
+    pass
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+_COPY_UNESCAPES = {"\\": "\\", "t": "\t", "n": "\n", "r": "\r", "b": "\b", "f": "\f", "v": "\v"}
+
+def _copy_row(row):
+    return ("\t".join(
+        "\\N" if value is None else str(value).translate(_COPY_ESCAPES) for value in row
+    ) + "\n").encode()
+
+def _copy_value(value):
+    if value == "\\N":
+        return None
+    if "\\" not in value:
+        return value
+    result = []
+    escaped = False
+    for char in value:
+        if escaped:
+            result.append(_COPY_UNESCAPES.get(char, char))
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        else:
+            result.append(char)
+    return "".join(result)
+
+def _copy_parse(data):
+    return tuple(_copy_value(value) for value in data.decode()[:-1].split("\t"))
+
+_EXECUTE = b"E\x00\x00\x00\t\x00\x00\x00\x00\x00"
+_SYNC_FLUSH = b"S\x00\x00\x00\x04H\x00\x00\x00\x04"
+
+class _Statement:
+    # Wire protocol shared by Statement and AsyncStatement. Builds messages and
+    # interprets replies; the subclasses only do the I/O.
+
+    def _bind_connection(self, connection):
         self._get_ready = connection._get_ready
         self._send_message = connection._send_message
         self._read_message = connection._read_message
+
+    def _parse(self, statement, named):
         self._name = str(hash(statement)).encode() + b"\x00" if named else b"\x00"
         p_msg = self._name + statement.encode() + b"\x00\x00\x00"
-        self._send_message(
+        return (
             b"P" + (len(p_msg) + 4).to_bytes(4, signed = True) + p_msg +
             b"D" + (len(self._name) + 5).to_bytes(4, signed = True) + b"S" + self._name +
-            b"S\x00\x00\x00\x04H\x00\x00\x00\x04"
+            _SYNC_FLUSH
         ) # Parse + Describe + Sync + Flush
-        self._get_ready(ready = False)
-        self._read_message() # ParseComplete
-        self._read_message() # ParameterDescription
-        msg = self._read_message() # RowDescription
+
+    def _describe(self, msg, dataclass, binary):
+        self._formats = b"\x00\x00"
+        self._decode = _DataRow.__call__
         if msg == 110: # NoData
             self._factory = None
-        else:
-            self._factory = make_dataclass(
-                dataclass.__name__,
-                msg[0],
-                bases = (dataclass,),
-                slots = True
-            ) if dataclass else make_dataclass(
-                "Row",
-                msg[0],
-                slots = True
+            return
+        self._factory = make_dataclass(
+            dataclass.__name__,
+            msg[0],
+            bases = (dataclass,),
+            slots = True
+        ) if dataclass else make_dataclass(
+            "Row",
+            msg[0],
+            slots = True
+        )
+        self._types = msg[1]
+        if binary:
+            formats = [oid in binary_types for oid in msg[2]]
+            self._formats = len(formats).to_bytes(2, signed = True) + b"".join(
+                b"\x00\x01" if is_binary else b"\x00\x00" for is_binary in formats
             )
-            self._types = msg[1]
+            self._types = [
+                binary_types[oid] if is_binary else (lambda x, decode = decode: decode(x.tobytes()))
+                for oid, is_binary, decode in zip(msg[2], formats, msg[1])
+            ]
+            self._decode = _DataRow.view
+
+    def _bind(self, args):
+        b_msg = b"\x00" + self._name + b"\x00\x00" + len(args).to_bytes(2, signed = True)
+        for arg in args:
+            if arg is None:
+                b_msg += b"\xff\xff\xff\xff"
+            else:
+                arg = str(arg).encode()
+                b_msg += len(arg).to_bytes(4, signed = True) + arg
+        b_msg += self._formats
+        return b"B" + (len(b_msg) + 4).to_bytes(4, signed = True) + b_msg # Bind
+
+    def _batches(self, rows, batch_size):
+        batch = []
+        for args in rows:
+            batch.append(self._bind(args) + _EXECUTE) # Bind + Execute
+            if len(batch) == batch_size:
+                yield b"".join(batch) + _SYNC_FLUSH, len(batch)
+                batch = []
+        if batch:
+            yield b"".join(batch) + _SYNC_FLUSH, len(batch) # (Bind + Execute) * n + Sync + Flush
+
+    def _row(self, row):
+        return self._factory(*self._decode(row, self._types))
+
+    def _col(self, row):
+        return next(self._decode(row, self._types))
+
+    def _close(self):
+        return (
+            b"C" + (len(self._name) + 5).to_bytes(4, signed = True) + b"S" + self._name +
+            b"H\x00\x00\x00\x04"
+        ) # Close + Flush
+
+class Statement(_Statement):
+    def __init__(self, connection, statement, named, dataclass, binary = False):
+        self._bind_connection(connection)
+        self._send_message(self._parse(statement, named)) # Parse + Describe + Sync + Flush
+        self._get_ready(ready = False)
+        self._read_message() # ParseComplete
+        self._read_message() # ParameterDescription
+        self._describe(self._read_message(), dataclass, binary) # RowDescription
         self._read_message() # ReadyForQuery
 
     def __enter__(self):
@@ -120,27 +333,37 @@ class Statement:
         Arguments:
             *args: Arguments for the prepared SQL statement. Must be representable as strings.
         """
-        b_msg = b"\x00" + self._name + b"\x00\x00" + len(args).to_bytes(2, signed = True)
-        for arg in args:
-            if arg is None:
-                b_msg += b"\xff\xff\xff\xff"
-            else:
-                arg = str(arg).encode()
-                b_msg += len(arg).to_bytes(4, signed = True) + arg
-        b_msg +=  b"\x00\x00"
-        self._send_message(
-            b"B" + (len(b_msg) + 4).to_bytes(4, signed = True) + b_msg +
-            b"E\x00\x00\x00\t\x00\x00\x00\x00\x00S\x00\x00\x00\x04H\x00\x00\x00\x04"
-        ) # Bind + Execute + Sync + Flush
+        self._send_message(self._bind(args) + _EXECUTE + _SYNC_FLUSH) # Bind + Execute + Sync + Flush
         self._get_ready(ready = False)
         self._read_message() # BindComplete
         if self._factory:
             return self
         self._read_message() # ReadyForQuery
 
+    def executemany(self, rows, batch_size = 1000):
+        """
+        Execute the statement once per argument tuple, pipelining the executions. Don't
+        retrieve data. Returns the number of executions.
+
+        Bind and Execute messages for up to batch_size rows are sent behind a single Sync,
+        so a batch costs one network round trip instead of one per row. Each batch runs in
+        its own implicit transaction unless an explicit transaction is open.
+
+        Arguments:
+            rows: An iterable of argument tuples. Arguments must be representable as strings.
+            batch_size: Number of executions sent before waiting for the server's completions.
+        """
+        count = 0
+        for message, size in self._batches(rows, batch_size):
+            self._send_message(message) # (Bind + Execute) * n + Sync + Flush
+            self._get_ready(ready = False)
+            while self._read_message(): pass # (BindComplete + DataRow * m) * n + ReadyForQuery
+            count += size
+        return count
+
     def __iter__(self):
         while (row := self._read_message()): # DataRow
-            yield self._factory(*row(self._types))
+            yield self._row(row)
 
     def row(self):
         """
@@ -148,7 +371,7 @@ class Statement:
         """
         row = self._read_message() # DataRow
         if row:
-            return self._factory(*row(self._types))
+            return self._row(row)
 
     def col(self):
         """
@@ -156,16 +379,13 @@ class Statement:
         """
         row = self._read_message() # DataRow
         if row:
-            return next(row(self._types))
+            return self._col(row)
 
     def close(self):
         """
         Close the statement.
         """
-        self._send_message(
-            b"C" + (len(self._name) + 5).to_bytes(4, signed = True) + b"S" + self._name +
-            b"H\x00\x00\x00\x04"
-        ) # Close + Flush
+        self._send_message(self._close()) # Close + Flush
         self._get_ready()
         self._read_message() # CloseComplete
 
@@ -184,7 +404,118 @@ class Transaction:
             raise
         self.commit()
 
-class Connection:
+_SKIP = object()
+
+def _startup(user, database):
+    s_msg = b"\x00\x03\x00\x00user\x00" + user.encode() + b"\x00"
+    if database:
+        s_msg += b"database\x00" + database.encode() + b"\x00"
+    s_msg += b"client_encoding\x00UTF8\x00\x00"
+    return (len(s_msg) + 4).to_bytes(4, signed = True) + s_msg # StartupMessage
+
+def _query(string):
+    q_msg = string.encode() + b"\x00"
+    return b"Q" + (len(q_msg) + 4).to_bytes(4, signed = True) + q_msg # Query
+
+def _password(password):
+    p_msg = password.encode() + b"\x00"
+    return b"p" + (len(p_msg) + 4).to_bytes(4, signed = True) + p_msg # PasswordMessage
+
+def _md5(user, password, salt):
+    from hashlib import md5
+    p_msg = md5(password.encode() + user.encode()).hexdigest().encode()
+    p_msg = b"md5" + md5(p_msg + salt).hexdigest().encode() + b"\x00"
+    return b"p" + (len(p_msg) + 4).to_bytes(4, signed = True) + p_msg # PasswordMessage
+
+class _Scram:
+    # SCRAM-SHA-256 message construction and verification shared by both connection types
+
+    def __init__(self, user, password):
+        from base64 import standard_b64encode
+        from os import urandom
+        if not (user.isascii() and password.isascii()):
+            raise Fatal("user and password must consist of ASCII characters only")
+        self._password = password
+        user = user.replace(",", "=2C").replace("=", "=3D")
+        self._client_nonce = standard_b64encode(urandom(24))
+        self._client_first_bare = b"n=" + user.encode() + b",r=" + self._client_nonce
+
+    def initial_response(self):
+        sasl_auth_mechanism = b"SCRAM-SHA-256\x00"
+        client_first_message = b"n,," + self._client_first_bare
+        return (
+            b"p" +
+            (len(sasl_auth_mechanism) + len(client_first_message) + 8).to_bytes(4, signed = True) +
+            sasl_auth_mechanism +
+            len(client_first_message).to_bytes(4, signed = True) +
+            client_first_message
+        ) # SASLInitialResponse
+
+    def response(self, code, server_first_message):
+        from base64 import standard_b64decode, standard_b64encode
+        from hashlib import pbkdf2_hmac, sha256
+        from hmac import digest
+        if code != 11: # AuthenticationSASLContinue
+            raise Fatal("server didn't respond with an AuthenticationSASLContinue message")
+        parsed = dict(item.split(b"=", 1) for item in server_first_message.split(b","))
+        if not parsed[b"r"].startswith(self._client_nonce):
+            raise Fatal("server returned an invalid nonce")
+        without_proof = b"c=biws,r=" + parsed[b"r"]
+        self._auth_message = b",".join((self._client_first_bare, server_first_message, without_proof))
+        self._salted_password = pbkdf2_hmac(
+            "sha256",
+            self._password.encode(),
+            standard_b64decode(parsed[b"s"]),
+            int(parsed[b"i"])
+        )
+        client_key = digest(self._salted_password, b"Client Key", "sha256")
+        client_sig = digest(sha256(client_key).digest(), self._auth_message, "sha256")
+        client_proof = bytes(x ^ y for x, y in zip(client_key, client_sig))
+        client_final_message = without_proof + b",p=" + standard_b64encode(client_proof)
+        return (
+            b"p" +
+            (len(client_final_message) + 4).to_bytes(4, signed = True) +
+            client_final_message
+        ) # SASLResponse
+
+    def verify(self, code, server_final_message):
+        from base64 import standard_b64encode
+        from hmac import digest, compare_digest
+        if code != 12: # AuthenticationSASLFinal
+            raise Fatal("server didn't respond with an AuthenticationSASLFinal message")
+        parsed = dict(item.split(b"=", 1) for item in server_final_message.split(b","))
+        server_key = digest(self._salted_password, b"Server Key", "sha256")
+        server_sig = digest(server_key, self._auth_message, "sha256")
+        if not compare_digest(parsed[b"v"], standard_b64encode(server_sig)):
+            raise Fatal("server returned an invalid signature")
+
+class _Session:
+    # Message dispatch shared by Connection and AsyncConnection
+
+    def _handle_message(self, code, data):
+        match code:
+            case 68: return _DataRow(data) # DataRow
+            case 84: return _row_description(data) # RowDescription
+            case 90: # ReadyForQuery
+                self._ready = True
+                return
+            case 100 if self._copying: return _CopyData(data) # CopyData
+            case 67 if self._copying: return _CommandComplete(data) # CommandComplete
+            case 67: return _SKIP # CommandComplete
+            case 73: return _SKIP # EmptyQueryResponse
+            case 83: return _SKIP # ParameterStatus
+            case 78: return _SKIP # NoticeResponse
+            case 82: return _authentication_request(data)
+            case 69: raise _error_response(data) # ErrorResponse
+            case 65: raise Fatal("LISTEN not supported") # NotificationResponse
+            case 71 if self._copying: return code # CopyInResponse
+            case 72 if self._copying: return code # CopyOutResponse
+            case 71: raise Fatal("COPY FROM STDIN requires Connection.copy_from") # CopyInResponse
+            case 72: raise Fatal("COPY TO STDOUT requires Connection.copy_to") # CopyOutResponse
+            case 87: raise Fatal("COPY BOTH not supported") # CopyBothResponse
+        return code
+
+class Connection(_Session):
     def __init__(self,
             address: tuple[str, int] | str = ("localhost", 5432),
             user: str = "postgres",
@@ -206,6 +537,7 @@ class Connection:
             tls_cert: Path to a PEM-format file containing the private key and certificate used for certificate authentication.
             tls_ca: Path to a PEM-format file containing the certificates of trusted certificate authorities. If None, system defaults are loaded instead.
         """
+        self._copying = False
         if isinstance(address, str):
             from socket import socket, AF_UNIX
             self._sock = socket(AF_UNIX)
@@ -229,13 +561,7 @@ class Connection:
             else:
                 context.load_default_certs()
             self._sock = context.wrap_socket(self._sock, server_hostname = address[0])
-        s_msg = b"\x00\x03\x00\x00user\x00" + user.encode() + b"\x00"
-        if database:
-            s_msg += b"database\x00" + database.encode() + b"\x00"
-        s_msg += b"client_encoding\x00UTF8\x00\x00"
-        self._send_message(
-            (len(s_msg) + 4).to_bytes(4, signed = True) + s_msg
-        ) # StartupMessage
+        self._send_message(_startup(user, database)) # StartupMessage
         code, data = self._read_message()
         if code in (3, 5, 10):
             if not password:
@@ -259,7 +585,7 @@ class Connection:
         if error:
             raise
 
-    def __call__(self, statement, *args, dataclass = None):
+    def __call__(self, statement, *args, dataclass = None, binary = False):
         """
         Execute a one-time statement. Returns an iterator of dataclass instances or None.
 
@@ -267,18 +593,35 @@ class Connection:
             statement: The SQL statement to execute.
             *args: Arguments for the SQL statement. Must be representable as strings.
             dataclass: A base for the dataclass used for generating rows.
+            binary: Receive columns whose type is in pgsql.binary_types in binary format.
         """
-        return Statement(self, statement, False, dataclass)(*args)
+        return Statement(self, statement, False, dataclass, binary)(*args)
 
-    def prepare(self, statement, dataclass = None):
+    def prepare(self, statement, dataclass = None, binary = False):
         """
         Prepare a statement. Returns an pgsql.Statement instance.
 
         Arguments:
             statement: The SQL statement to prepare.
             dataclass: A base for the dataclass used for generating rows.
+            binary: Receive columns whose type is in pgsql.binary_types in binary format
+                and decode them natively (e.g. timestamp to datetime, jsonb to dict, int4[]
+                to list). Other columns are received as text.
+        """
+        return Statement(self, statement, True, dataclass, binary)
+
+    def executemany(self, statement, rows, batch_size = 1000):
         """
-        return Statement(self, statement, True, dataclass)
+        Execute a one-time statement once per argument tuple, pipelining the executions.
+        Don't retrieve data. Returns the number of executions.
+
+        Arguments:
+            statement: The SQL statement to execute.
+            rows: An iterable of argument tuples. Arguments must be representable as strings.
+            batch_size: Number of executions sent behind a single Sync.
+        """
+        with Statement(self, statement, False, None) as statement:
+            return statement.executemany(rows, batch_size)
 
     def explain(self, statement, *args, analyze = False):
         """
@@ -307,13 +650,100 @@ class Connection:
         if file:
             with open(file) as f:
                 string = f.read()
-        q_msg = string.encode() + b"\x00"
-        self._send_message(
-            b"Q" + (len(q_msg) + 4).to_bytes(4, signed = True) + q_msg
-        ) # Query
+        self._send_message(_query(string)) # Query
         self._get_ready(ready = False)
         self._get_ready()
 
+    def copy_from(self, statement, source, chunk_size = 65536):
+        """
+        Execute a COPY ... FROM STDIN statement, streaming data from source. Returns the
+        number of rows copied.
+
+        Data is sent in CopyData messages of about chunk_size bytes, so memory use doesn't
+        depend on the size of source. If source raises, the COPY is aborted with CopyFail
+        and the exception is re-raised.
+
+        Arguments:
+            statement: The COPY ... FROM STDIN statement to execute.
+            source: A file-like object with a read method, or an iterable of rows (tuples
+                of values representable as strings, None for NULL) or of preformatted
+                str/bytes chunks.
+            chunk_size: Approximate size of each CopyData message in bytes.
+        """
+        self._send_message(_query(statement)) # Query
+        self._get_ready(ready = False)
+        self._copying = True
+        try:
+            self._read_message() # CopyInResponse
+            try:
+                if hasattr(source, "read"):
+                    chunks = iter(lambda: source.read(chunk_size), source.read(0))
+                else:
+                    chunks = (
+                        chunk if isinstance(chunk, (bytes, str)) else _copy_row(chunk)
+                        for chunk in source
+                    )
+                buffer = []
+                size = 0
+                for chunk in chunks:
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    buffer.append(chunk)
+                    size += len(chunk)
+                    if size >= chunk_size:
+                        self._copy_data(b"".join(buffer))
+                        buffer = []
+                        size = 0
+                if buffer:
+                    self._copy_data(b"".join(buffer))
+            except BaseException as error:
+                f_msg = f"{type(error).__name__}: {error}".encode() + b"\x00"
+                self._send_message(
+                    b"f" + (len(f_msg) + 4).to_bytes(4, signed = True) + f_msg
+                ) # CopyFail
+                try:
+                    self._read_message() # ErrorResponse
+                except Error:
+                    pass
+                raise
+            self._send_message(
+                b"c\x00\x00\x00\x04"
+            ) # CopyDone
+            tag = self._read_message() # CommandComplete
+            self._get_ready()
+            return int(tag.split()[-1].rstrip(b"\x00"))
+        finally:
+            self._copying = False
+
+    def copy_to(self, statement, file = None):
+        """
+        Execute a COPY ... TO STDOUT statement. Returns an iterator of rows (tuples of
+        strings or None) when file is None, otherwise the number of rows written.
+
+        Rows are parsed from COPY text format; with file set, CopyData is written
+        unchanged, so any COPY format (text, CSV, binary) can be exported. Either way
+        only one row is held in memory at a time.
+
+        Arguments:
+            statement: The COPY ... TO STDOUT statement to execute.
+            file: A binary file-like object with a write method.
+        """
+        self._send_message(_query(statement)) # Query
+        self._get_ready(ready = False)
+        self._copying = True
+        try:
+            self._read_message() # CopyOutResponse
+        except BaseException:
+            self._copying = False
+            raise
+        if file is None:
+            return map(_copy_parse, self._copy_out())
+        count = 0
+        for data in self._copy_out():
+            file.write(data)
+            count += 1
+        return count
+
     def transaction(self):
         """
         Begin a transaction in a with statement context. Returns a pgsql.Transaction instance
@@ -332,105 +762,292 @@ class Connection:
         self._sock.close()
 
     def _receive(self, size):
-        data = self._sock.recv(size)
+        data = b""
         while(len(data) < size):
-            data += self._sock.recv(size - len(data))
+            chunk = self._sock.recv(size - len(data))
+            if not chunk:
+                raise EOFError("Connection closed by the server")
+            data += chunk
         return data
 
     def _read_message(self):
-        code, size = unpack("!bi", self._receive(5))
-        if size > 4:
-            data = self._receive(size - 4)
-        match code:
-            case 68: return _DataRow(data) # DataRow
-            case 84: return _row_description(data) # RowDescription
-            case 90: # ReadyForQuery
-                self._ready = True
-                return
-            case 67: return self._read_message() # CommandComplete
-            case 73: return self._read_message() # EmptyQueryResponse
-            case 83: return self._read_message() # ParameterStatus
-            case 78: return self._read_message() # NoticeResponse
-            case 82: return _authentication_request(data)
-            case 69: raise _error_response(data) # ErrorResponse
-            case 65: raise Fatal("LISTEN not supported") # NotificationResponse
-            case 71: raise Fatal("COPY between client and server not supported") # CopyInResponse
-            case 72: raise Fatal("COPY between client and server not supported") # CopyOutResponse
-            case 87: raise Fatal("COPY between client and server not supported") # CopyBothResponse
-        return code
+        while True:
+            code, size = unpack("!bi", self._receive(5))
+            data = self._receive(size - 4) if size > 4 else b""
+            if (msg := self._handle_message(code, data)) is not _SKIP:
+                return msg
+
+    def _copy_data(self, data):
+        self._send_message(
+            b"d" + (len(data) + 4).to_bytes(4, signed = True) + data
+        ) # CopyData
+
+    def _copy_out(self):
+        while isinstance(data := self._read_message(), _CopyData): # CopyData
+            yield data
+        self._get_ready() # CommandComplete + ReadyForQuery
 
     def _send_message(self, data):
         self._sock.sendall(data)
 
     def _get_ready(self, ready = True):
         if not self._ready:
+            self._copying = False # Leftover CopyData of an abandoned copy_to is discarded
             while self._read_message(): pass # ReadyForQuery
         self._ready = ready
 
     def _auth_password(self, password):
-        p_msg = password.encode() + b"\x00"
-        self._send_message(
-            b"p" + (len(p_msg) + 4).to_bytes(4, signed = True) + p_msg
-        ) # PasswordMessage
+        self._send_message(_password(password)) # PasswordMessage
 
     def _auth_md5(self, user, password, salt):
-        from hashlib import md5
-        p_msg = md5(password.encode() + user.encode()).hexdigest().encode()
-        p_msg = b"md5" + md5(p_msg + salt).hexdigest().encode() + b"\x00"
-        self._send_message(
-            b"p" + (len(p_msg) + 4).to_bytes(4, signed = True) + p_msg
-        ) # PasswordMessage
+        self._send_message(_md5(user, password, salt)) # PasswordMessage
 
     def _auth_scram_sha_256(self, user, password):
-        from base64 import standard_b64decode, standard_b64encode
-        from hashlib import pbkdf2_hmac, sha256
-        from hmac import digest, compare_digest
-        from os import urandom
-        if not (user.isascii() and password.isascii()):
-            raise Fatal("user and password must consist of ASCII characters only")
-        user = user.replace(",", "=2C").replace("=", "=3D")
-        sasl_auth_mechanism = b"SCRAM-SHA-256\x00"
-        client_nonce = standard_b64encode(urandom(24))
-        client_first_bare = b"n=" + user.encode() + b",r=" + client_nonce
-        client_first_message = b"n,," + client_first_bare
-        self._send_message(
-            b"p" +
-            (len(sasl_auth_mechanism) + len(client_first_message) + 8).to_bytes(4, signed = True) +
-            sasl_auth_mechanism +
-            len(client_first_message).to_bytes(4, signed = True) +
-            client_first_message
-        ) # SASLInitialResponse
-        code, server_first_message = self._read_message()
-        if code != 11: # AuthenticationSASLContinue
-            raise Fatal("server didn't respond with an AuthenticationSASLContinue message")
-        parsed = dict(item.split(b"=", 1) for item in server_first_message.split(b","))
-        if not parsed[b"r"].startswith(client_nonce):
-            raise Fatal("server returned an invalid nonce")
-        without_proof = b"c=biws,r=" + parsed[b"r"]
-        auth_message = b",".join((client_first_bare, server_first_message, without_proof))
-        salted_password = pbkdf2_hmac(
-            "sha256",
-            password.encode(),
-            standard_b64decode(parsed[b"s"]),
-            int(parsed[b"i"])
-        )
-        client_key = digest(salted_password, b"Client Key", "sha256")
-        client_sig = digest(sha256(client_key).digest(), auth_message, "sha256")
-        client_proof = bytes(x ^ y for x, y in zip(client_key, client_sig))
-        client_final_message = without_proof + b",p=" + standard_b64encode(client_proof)
-        self._send_message(
-            b"p" +
-            (len(client_final_message) + 4).to_bytes(4, signed = True) +
-            client_final_message
-        ) # SASLResponse
-        code, server_final_message = self._read_message()
-        if code != 12: # AuthenticationSASLFinal
-            raise Fatal("server didn't respond with an AuthenticationSASLFinal message")
-        parsed = dict(item.split(b"=", 1) for item in server_final_message.split(b","))
-        server_key = digest(salted_password, b"Server Key", "sha256")
-        server_sig = digest(server_key, auth_message, "sha256")
-        if not compare_digest(parsed[b"v"], standard_b64encode(server_sig)):
-            raise Fatal("server returned an invalid signature")
+        scram = _Scram(user, password)
+        self._send_message(scram.initial_response()) # SASLInitialResponse
+        self._send_message(scram.response(*self._read_message())) # SASLResponse
+        scram.verify(*self._read_message()) # AuthenticationSASLFinal
+
+class AsyncStatement(_Statement):
+    def __init__(self, connection):
+        self._bind_connection(connection)
+
+    async def _prepare(self, statement, named, dataclass, binary):
+        await self._send_message(self._parse(statement, named)) # Parse + Describe + Sync + Flush
+        await self._get_ready(ready = False)
+        await self._read_message() # ParseComplete
+        await self._read_message() # ParameterDescription
+        self._describe(await self._read_message(), dataclass, binary) # RowDescription
+        await self._read_message() # ReadyForQuery
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, error, value, traceback):
+        await self.close()
+        if error:
+            raise
+
+    async def __call__(self, *args):
+        """
+        Execute the statement. Returns the statement itself, to be used with async for,
+        row() or col(), if the statement returns rows, otherwise None.
+
+        Arguments:
+            *args: Arguments for the prepared SQL statement. Must be representable as strings.
+        """
+        await self._send_message(self._bind(args) + _EXECUTE + _SYNC_FLUSH) # Bind + Execute + Sync + Flush
+        await self._get_ready(ready = False)
+        await self._read_message() # BindComplete
+        if self._factory:
+            return self
+        await self._read_message() # ReadyForQuery
+
+    async def executemany(self, rows, batch_size = 1000):
+        """
+        Execute the statement once per argument tuple, pipelining the executions. Don't
+        retrieve data. Returns the number of executions. See Statement.executemany.
+
+        Arguments:
+            rows: An iterable of argument tuples. Arguments must be representable as strings.
+            batch_size: Number of executions sent before waiting for the server's completions.
+        """
+        count = 0
+        for message, size in self._batches(rows, batch_size):
+            await self._send_message(message) # (Bind + Execute) * n + Sync + Flush
+            await self._get_ready(ready = False)
+            while await self._read_message(): pass # (BindComplete + DataRow * m) * n + ReadyForQuery
+            count += size
+        return count
+
+    async def __aiter__(self):
+        while (row := await self._read_message()): # DataRow
+            yield self._row(row)
+
+    async def row(self):
+        """
+        Return the first row. Returns a dataclass instance or None.
+        """
+        row = await self._read_message() # DataRow
+        if row:
+            return self._row(row)
+
+    async def col(self):
+        """
+        Return the first column of the first row. Returns a single value or None.
+        """
+        row = await self._read_message() # DataRow
+        if row:
+            return self._col(row)
+
+    async def close(self):
+        """
+        Close the statement.
+        """
+        await self._send_message(self._close()) # Close + Flush
+        await self._get_ready()
+        await self._read_message() # CloseComplete
+
+class AsyncTransaction:
+    def __init__(self, connection):
+        self._connection = connection
+
+    async def __aenter__(self):
+        await self._connection.begin()
+
+    async def __aexit__(self, error, value, traceback):
+        if error:
+            await self._connection.rollback()
+            raise
+        await self._connection.commit()
+
+class AsyncConnection(_Session):
+    def __init__(self,
+            address: tuple[str, int] | str = ("localhost", 5432),
+            user: str = "postgres",
+            password: str | None = None,
+            database: str | None = None,
+            tls: bool = False,
+            tls_cert: str | None = None,
+            tls_ca: str | None = None
+        ) -> None:
+        """
+        Create an asyncio database connection. The connection is opened by awaiting the
+        instance or entering it with async with. Arguments are the same as for
+        pgsql.Connection.
+
+        A connection runs one operation at a time; tasks that need to query concurrently
+        should use separate connections.
+        """
+        self._args = (address, user, password, database, tls, tls_cert, tls_ca)
+        self._copying = False
+        self._writer = None
+
+    def __await__(self):
+        return self._connect().__await__()
+
+    async def _connect(self):
+        import asyncio
+        address, user, password, database, tls, tls_cert, tls_ca = self._args
+        if isinstance(address, str):
+            self._reader, self._writer = await asyncio.open_unix_connection(address)
+        else:
+            self._reader, self._writer = await asyncio.open_connection(*address) # Sets TCP_NODELAY
+        if tls or tls_cert or tls_ca:
+            await self._send_message(
+                b"\x00\x00\x00\x08\x04\xd2\x16/"
+            ) # SSLRequest
+            if await self._reader.readexactly(1) != b"S":
+                raise Fatal("server denied the TLS request")
+            from ssl import SSLContext, PROTOCOL_TLS_CLIENT
+            context = SSLContext(PROTOCOL_TLS_CLIENT)
+            if tls_cert:
+                context.load_cert_chain(tls_cert)
+            if tls_ca:
+                context.load_verify_locations(tls_ca)
+            else:
+                context.load_default_certs()
+            await self._writer.start_tls(context, server_hostname = address[0])
+        await self._send_message(_startup(user, database)) # StartupMessage
+        code, data = await self._read_message()
+        if code in (3, 5, 10):
+            if not password:
+                raise Fatal("server requested a password but none was provided")
+            match code:
+                case 3: await self._send_message(_password(password)) # AuthenticationCleartextPassword
+                case 5: await self._send_message(_md5(user, password, data)) # AuthenticationMD5Password
+                case 10: # AuthenticationSASL
+                    scram = _Scram(user, password)
+                    await self._send_message(scram.initial_response()) # SASLInitialResponse
+                    await self._send_message(scram.response(*await self._read_message())) # SASLResponse
+                    scram.verify(*await self._read_message()) # AuthenticationSASLFinal
+        elif code != 0: # AuthenticationOk
+            raise Fatal("server requested an unsupported authentication method")
+        while await self._read_message(): pass # ReadyForQuery
+        self.begin = await self.prepare("BEGIN")
+        self.commit = await self.prepare("COMMIT")
+        self.rollback = await self.prepare("ROLLBACK")
+        return self
+
+    async def __aenter__(self):
+        if self._writer is None:
+            await self._connect()
+        return self
+
+    async def __aexit__(self, error, value, traceback):
+        await self.close()
+        if error:
+            raise
+
+    async def __call__(self, statement, *args, dataclass = None, binary = False):
+        """
+        Execute a one-time statement. Returns an AsyncStatement to iterate with async for,
+        or None. See Connection.__call__.
+        """
+        statement = await AsyncStatement(self)._prepare(statement, False, dataclass, binary)
+        return await statement(*args)
+
+    async def prepare(self, statement, dataclass = None, binary = False):
+        """
+        Prepare a statement. Returns a pgsql.AsyncStatement instance. See Connection.prepare.
+        """
+        return await AsyncStatement(self)._prepare(statement, True, dataclass, binary)
+
+    async def executemany(self, statement, rows, batch_size = 1000):
+        """
+        Execute a one-time statement once per argument tuple, pipelining the executions.
+        Don't retrieve data. Returns the number of executions.
+        """
+        async with await AsyncStatement(self)._prepare(statement, False, None, False) as statement:
+            return await statement.executemany(rows, batch_size)
+
+    async def execute(self, string = None, file = None):
+        """
+        Execute one or more statements as a single transaction. Don't retrieve data. Returns None.
+        See Connection.execute.
+        """
+        if file:
+            with open(file) as f:
+                string = f.read()
+        await self._send_message(_query(string)) # Query
+        await self._get_ready(ready = False)
+        await self._get_ready()
+
+    def transaction(self):
+        """
+        Begin a transaction in an async with statement context. Returns a
+        pgsql.AsyncTransaction instance.
+        """
+        return AsyncTransaction(self)
+
+    async def close(self):
+        """
+        Close the database connection.
+        """
+        try:
+            await self._send_message(
+                b"X\x00\x00\x00\x04"
+            ) # Terminate
+        finally:
+            self._writer.close()
+
+    async def _read_message(self):
+        while True:
+            code, size = unpack("!bi", await self._reader.readexactly(5))
+            data = await self._reader.readexactly(size - 4) if size > 4 else b""
+            if (msg := self._handle_message(code, data)) is not _SKIP:
+                return msg
+
+    async def _send_message(self, data):
+        self._writer.write(data)
+        await self._writer.drain()
+
+    async def _get_ready(self, ready = True):
+        if not self._ready:
+            self._copying = False
+            while await self._read_message(): pass # ReadyForQuery
+        self._ready = ready
 
 class Error(Exception):
     """An error that caused the current command to abort."""
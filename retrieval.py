@@ -0,0 +1,162 @@
+import os
+import math
+import glob
+import logging
+import threading
+from collections import Counter, defaultdict
+
+import numpy as np
+
+import vector_store
+from tokenizer import tokenize
+
+CORPUS_DIR = os.getenv("RETRIEVAL_CORPUS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "scraping"))
+CHUNK_WORDS = int(os.getenv("RETRIEVAL_CHUNK_WORDS", "120"))
+TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "5"))
+ANSWER_MODEL = os.getenv("RETRIEVAL_MODEL", "gpt-4o-mini")
+# Trechos usados como contexto no /chat. O melhor trecho precisa atingir MIN_SCORE (calibrado no
+# corpus atual: perguntas sobre os documentos têm o melhor trecho acima de 5, cumprimentos e
+# conversa em geral abaixo) e os demais, MIN_RELATIVE_SCORE da pontuação dele
+CONTEXT_K = int(os.getenv("RETRIEVAL_CONTEXT_K", "3"))
+MIN_SCORE = float(os.getenv("RETRIEVAL_MIN_SCORE", "4.6"))
+MIN_RELATIVE_SCORE = float(os.getenv("RETRIEVAL_MIN_RELATIVE_SCORE", "0.6"))
+
+# Parâmetros usuais do BM25
+K1 = 1.2
+B = 0.75
+
+logger = logging.getLogger(__name__)
+
+# Índice do corpus atual (reconstruído apenas quando o hash do corpus muda)
+_index = None
+_lock = threading.Lock()
+
+def chunk_text(text, chunk_words=CHUNK_WORDS):
+    """ Agrupa linhas consecutivas em trechos de até chunk_words palavras (linhas longas são quebradas). """
+    chunks, current, size = [], [], 0
+    for line in text.splitlines():
+        words = line.split()
+        while words:
+            piece, words = words[:chunk_words], words[chunk_words:]
+            if size + len(piece) > chunk_words and current:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            current.append(" ".join(piece))
+            size += len(piece)
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+class Chunk:
+    def __init__(self, source, text):
+        self.source = source
+        self.text = text
+
+class BM25Index:
+    """
+    Índice invertido BM25 em memória.
+
+    Os pesos BM25 de cada ocorrência (termo, trecho) são calculados na construção; a busca
+    apenas soma, com NumPy, os pesos das listas de ocorrências dos termos da consulta.
+    """
+
+    def __init__(self, chunks, version=None):
+        self.chunks = chunks
+        self.version = version
+        self.signature = None
+        documents = [Counter(tokenize(chunk.text)) for chunk in chunks]
+        lengths = np.array([sum(terms.values()) for terms in documents], dtype=np.float32)
+        average = float(lengths.mean()) if len(chunks) else 0.0
+
+        postings = defaultdict(list)
+        for doc_id, terms in enumerate(documents):
+            for term, frequency in terms.items():
+                postings[term].append((doc_id, frequency))
+
+        count = len(chunks)
+        self.postings = {}
+        for term, entries in postings.items():
+            doc_ids = np.array([doc_id for doc_id, _ in entries], dtype=np.int32)
+            frequencies = np.array([frequency for _, frequency in entries], dtype=np.float32)
+            idf = math.log(1 + (count - len(entries) + 0.5) / (len(entries) + 0.5))
+            norm = K1 * (1 - B + B * lengths[doc_ids] / average)
+            self.postings[term] = (doc_ids, (idf * frequencies * (K1 + 1) / (frequencies + norm)).astype(np.float32))
+        self._scores = np.zeros(count, dtype=np.float32)
+
+    def search(self, query, k=TOP_K):
+        """ Retorna os k trechos mais relevantes como [(pontuação, Chunk)], da maior para a menor. """
+        terms = [term for term in set(tokenize(query)) if term in self.postings]
+        if not terms:
+            return []
+        scores = np.zeros_like(self._scores)
+        for term in terms:
+            doc_ids, weights = self.postings[term]
+            scores[doc_ids] += weights
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[doc_id]), self.chunks[doc_id]) for doc_id in top if scores[doc_id] > 0]
+
+def corpus_files(directory=CORPUS_DIR):
+    return sorted(glob.glob(os.path.join(directory, "*.txt")))
+
+def build_index(file_paths, version=None):
+    chunks = []
+    for path in file_paths:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            source = os.path.basename(path)
+            chunks.extend(Chunk(source, text) for text in chunk_text(f.read()))
+    return BM25Index(chunks, version)
+
+def get_index(directory=CORPUS_DIR):
+    """ Retorna o índice do corpus, reconstruindo-o apenas quando o conteúdo dos arquivos muda. """
+    global _index
+    file_paths = corpus_files(directory)
+    # Tamanho e mtime evitam recalcular o hash do corpus a cada busca
+    signature = tuple((path, stat.st_mtime_ns, stat.st_size) for path, stat in ((path, os.stat(path)) for path in file_paths))
+    if _index is not None and _index.signature == signature:
+        return _index
+    with _lock:
+        if _index is None or _index.signature != signature:
+            version = vector_store.corpus_version(file_paths)
+            if _index is None or _index.version != version:
+                _index = build_index(file_paths, version)
+                logger.info(f"Índice BM25 construído: {len(_index.chunks)} trechos, {len(_index.postings)} termos")
+            _index.signature = signature
+        return _index
+
+def search(query, k=TOP_K, directory=CORPUS_DIR):
+    return get_index(directory).search(query, k)
+
+def format_context(results):
+    """ Formata os trechos recuperados para o prompt, indicando o arquivo de origem. """
+    return "\n\n".join(f"[{chunk.source}]\n{chunk.text}" for _, chunk in results)
+
+def answer(client, query, k=TOP_K, model=ANSWER_MODEL, directory=CORPUS_DIR):
+    """
+    Responde a pergunta com os trechos mais relevantes do corpus e uma chamada a chat.completions,
+    sem o Assistants API nem Vector Store.
+
+    Returns:
+        dict: {"response": str} ou {"error": str}, como process_files_and_run_assistant.
+    """
+    results = search(query, k, directory)
+    if not results:
+        return {"error": "Nenhuma informação encontrada nos documentos."}
+
+    response = client.chat.completions.create(
+        model=model,
+        messages=[
+            {
+                "role": "system",
+                "content": (
+                    "Você é um assistente especializado no uso de ferramentas online do Centro Universitário Facens. "
+                    "Responda com base exclusivamente nos trechos de documentos abaixo. "
+                    "Se a informação não estiver neles, informe educadamente que não pode ajudar.\n\n"
+                    + format_context(results)
+                ),
+            },
+            {"role": "user", "content": query},
+        ],
+    )
+    return {"response": response.choices[0].message.content}
@@ -0,0 +1,218 @@
+import os
+import re
+import logging
+import threading
+
+import numpy as np
+
+from tokenizer import fold
+
+SIMILARITY_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_SIZE", "1000"))
+EMBEDDING_MODEL = os.getenv("SEMANTIC_CACHE_MODEL", "text-embedding-3-small")
+
+logger = logging.getLogger(__name__)
+
+def normalize(query):
+    """ Normaliza a pergunta: minúsculas, sem acentos, pontuação e espaços repetidos. """
+    return " ".join(re.findall(r"\w+", fold(query)))
+
+def openai_embedder(client, model=EMBEDDING_MODEL):
+    """ Retorna uma função texto -> embedding usando a API de embeddings da OpenAI. """
+    def embed(text):
+        return client.embeddings.create(model=model, input=text).data[0].embedding
+    return embed
+
+class SemanticCache:
+    """
+    Cache de respostas por similaridade semântica da pergunta.
+
+    Cada entrada guarda o embedding normalizado da pergunta, a resposta e o escopo/versão
+    em que foi gerada (ex.: assistente + hash do corpus, ou token + snapshot do Canvas).
+    A busca compara a pergunta com todas as entradas do mesmo escopo e versão de uma vez
+    (produto matricial com NumPy) e retorna a resposta mais próxima acima do limiar.
+
+    - Perguntas idênticas após a normalização são atendidas sem calcular embedding.
+    - Quando a versão de um escopo muda, as entradas antigas desse escopo são descartadas.
+    - Acima de max_entries, a entrada usada há mais tempo (LRU) é removida.
+
+    Args:
+        embed: Função texto -> vetor (lista de floats).
+        threshold: Similaridade de cosseno mínima para considerar um acerto.
+        max_entries: Número máximo de respostas mantidas.
+    """
+
+    def __init__(self, embed, threshold=SIMILARITY_THRESHOLD, max_entries=MAX_ENTRIES):
+        self.embed = embed
+        self.threshold = threshold
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._vectors = None
+        self._last_used = np.zeros(0, dtype=np.int64)
+        self._groups = np.zeros(0, dtype=np.int64)
+        self._entries = []  # [(grupo, pergunta normalizada, resposta)]
+        self._exact = {}  # {(grupo, pergunta normalizada): índice}
+        self._versions = {}  # {escopo: (versão, grupo)}
+        self._next_group = 0
+        self._clock = 0
+        self._lock = threading.Lock()
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 3),
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def lookup(self, query, scope=None, version=None):
+        """
+        Procura uma resposta para a pergunta no escopo/versão informados.
+
+        Returns:
+            tuple: (resposta ou None, embedding da pergunta ou None). O embedding pode ser
+            repassado a store para não ser calculado de novo.
+        """
+        key = normalize(query)
+        with self._lock:
+            group = self._group(scope, version)
+            index = self._exact.get((group, key))
+            if index is not None:
+                return self._hit(index, 1.0), None
+
+        vector = self._embed(key)
+        if vector is None:
+            with self._lock:
+                self.misses += 1
+            return None, None
+        with self._lock:
+            # O grupo pode ter mudado enquanto o embedding era calculado
+            group = self._group(scope, version)
+            best, similarity = None, 0.0
+            if self._entries:
+                similarities = self._vectors[:len(self._entries)] @ vector
+                similarities[self._groups != group] = -1.0
+                best = int(np.argmax(similarities))
+                similarity = float(similarities[best])
+            if best is not None and similarity >= self.threshold:
+                return self._hit(best, similarity), vector
+            self.misses += 1
+            logger.info(f"Cache semântico: miss (similaridade {similarity:.3f}, taxa de acerto {self.hit_rate:.1%})")
+            return None, vector
+
+    def store(self, query, answer, scope=None, version=None, vector=None):
+        """ Guarda a resposta da pergunta no escopo/versão informados. """
+        key = normalize(query)
+        if vector is None:
+            vector = self._embed(key)
+            if vector is None:
+                return
+        with self._lock:
+            group = self._group(scope, version)
+            index = self._exact.get((group, key))
+            if index is None:
+                if len(self._entries) >= self.max_entries:
+                    self._remove(int(np.argmin(self._last_used)))
+                    self.evictions += 1
+                index = self._append(group, key, answer, vector)
+            else:
+                self._entries[index] = (group, key, answer)
+            self._clock += 1
+            self._last_used[index] = self._clock
+
+    def invalidate(self, scope=None):
+        """ Descarta as entradas de um escopo (ou todas). """
+        with self._lock:
+            if scope is None:
+                count = len(self._entries)
+                self._vectors = None
+                self._last_used = np.zeros(0, dtype=np.int64)
+                self._groups = np.zeros(0, dtype=np.int64)
+                self._entries, self._exact, self._versions = [], {}, {}
+            else:
+                count = self._drop_scope(scope)
+            self.invalidations += count
+
+    def _group(self, scope, version):
+        """ Identificador numérico do par escopo/versão; uma versão nova invalida a anterior. """
+        current = self._versions.get(scope)
+        if current and current[0] == version:
+            return current[1]
+        if current:
+            dropped = self._drop_scope(scope)
+            self.invalidations += dropped
+            if dropped:
+                logger.info(f"Cache semântico: {dropped} respostas invalidadas (nova versão de {scope!r})")
+        group = self._next_group
+        self._next_group += 1
+        self._versions[scope] = (version, group)
+        return group
+
+    def _hit(self, index, similarity):
+        self.hits += 1
+        self._clock += 1
+        self._last_used[index] = self._clock
+        logger.info(f"Cache semântico: hit (similaridade {similarity:.3f}, taxa de acerto {self.hit_rate:.1%})")
+        return self._entries[index][2]
+
+    def _append(self, group, key, answer, vector):
+        count = len(self._entries)
+        if self._vectors is None:
+            self._vectors = np.zeros((min(self.max_entries, 64), vector.shape[0]), dtype=np.float32)
+        elif count == self._vectors.shape[0]:
+            # Cresce a matriz em blocos para não realocar a cada entrada
+            grown = np.zeros((min(self.max_entries, count * 2), self._vectors.shape[1]), dtype=np.float32)
+            grown[:count] = self._vectors
+            self._vectors = grown
+        self._vectors[count] = vector
+        self._last_used = np.append(self._last_used, 0)
+        self._groups = np.append(self._groups, group)
+        self._entries.append((group, key, answer))
+        self._exact[(group, key)] = count
+        return count
+
+    def _remove(self, index):
+        """ Remove a entrada trocando-a pela última (O(1) na matriz). """
+        last = len(self._entries) - 1
+        group, key, _ = self._entries[index]
+        del self._exact[(group, key)]
+        if index != last:
+            self._vectors[index] = self._vectors[last]
+            self._last_used[index] = self._last_used[last]
+            self._groups[index] = self._groups[last]
+            self._entries[index] = self._entries[last]
+            self._exact[self._entries[index][:2]] = index
+        self._entries.pop()
+        self._last_used = self._last_used[:last]
+        self._groups = self._groups[:last]
+
+    def _drop_scope(self, scope):
+        current = self._versions.pop(scope, None)
+        if not current:
+            return 0
+        stale = [index for index, entry in enumerate(self._entries) if entry[0] == current[1]]
+        # Do fim para o início, para que as trocas não movam índices ainda pendentes
+        for index in reversed(stale):
+            self._remove(index)
+        return len(stale)
+
+    def _embed(self, text):
+        """ Embedding normalizado (norma 1) do texto, ou None se o cálculo falhar. """
+        try:
+            vector = np.asarray(self.embed(text), dtype=np.float32)
+        except Exception as e:
+            # O cache nunca deve impedir a resposta: sem embedding, a pergunta segue para o modelo
+            logger.error(f"Falha ao calcular o embedding da pergunta: {str(e)}")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
@@ -1,8 +1,23 @@
 from fastapi import FastAPI
 from fastapi.responses import JSONResponse
 import uvicorn
+import os
+import sys
+import importlib.util
+
+# Módulos compartilhados com a Lambda (raiz do repositório) e o driver pgsql vendorizado em package/.
+# A raiz entra no início do sys.path, e o pgsql é carregado direto de package/ para que um pacote
+# instalado com o mesmo nome (ex.: o pgsql do PyPI) não o substitua. O restante de package/ fica
+# no final: são dependências da Lambda, com binários compilados para ela (aarch64).
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, "package"))
+_spec = importlib.util.spec_from_file_location("pgsql", os.path.join(ROOT, "package", "pgsql.py"))
+sys.modules["pgsql"] = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(sys.modules["pgsql"])
 
 from routes import chat
+from query import chats
 
 app = FastAPI(
     title="Canvas Chatbot",
@@ -22,6 +37,10 @@ app = FastAPI(
 
 app.include_router(router=chat.router)
 
+@app.on_event("shutdown")
+async def shutdown():
+    await chats.close()
+
 @app.get("/health")
 def health():
     return JSONResponse(content={"status": "OK"}, status_code=200)
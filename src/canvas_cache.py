@@ -0,0 +1,196 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import calendar_index
+import calendar_sync
+from utils import Request, TOKEN
+
+CACHE_TTL = float(os.getenv("CANVAS_CACHE_TTL", "300"))
+CACHE_MAX_STALE = float(os.getenv("CANVAS_CACHE_MAX_STALE", "3600"))
+# Tokens com snapshot (e ETags) guardados; os usados há mais tempo são descartados
+CACHE_MAX_TOKENS = int(os.getenv("CANVAS_CACHE_MAX_TOKENS", "100"))
+
+logger = logging.getLogger(__name__)
+
+class Snapshot:
+    """ Dados do Canvas usados por um turno de conversa: cursos, módulos, calendário e usuário. """
+
+    def __init__(self, courses, modules, calendar, username):
+        self.courses = courses
+        self.modules = modules
+        self.calendar = calendar
+        # Construído uma vez por snapshot e reutilizado por todas as consultas ao calendário
+        self.calendar_index = calendar_index.CalendarIndex(calendar, window=calendar_index.date_window(**calendar_sync.window_params()))
+        self.username = username
+        self.fetched_at = time.monotonic()
+        # Versão do conteúdo usado no prompt: muda apenas quando cursos ou módulos mudam
+        self.version = hashlib.sha256(
+            json.dumps([courses, modules], sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    def age(self):
+        return time.monotonic() - self.fetched_at
+
+class SnapshotCache:
+    """
+    Cache em memória (por processo) do snapshot do Canvas, indexado pelo token.
+
+    - Até ttl segundos o snapshot é servido sem nenhuma chamada ao Canvas.
+    - Entre ttl e max_stale o snapshot antigo é servido e uma thread o atualiza em segundo plano.
+    - Depois de max_stale (ou na primeira vez) a atualização é feita antes de responder; no event
+      loop, get_async a faz em uma thread.
+
+    Cada token tem no máximo uma atualização em andamento: quem chega durante ela espera o seu
+    resultado em vez de repetir as chamadas ao Canvas. Os snapshots e os ETags das requisições
+    condicionais (If-None-Match) ficam em um LRU de max_tokens tokens e são descartados juntos.
+    """
+
+    def __init__(self, ttl=CACHE_TTL, max_stale=CACHE_MAX_STALE, max_tokens=CACHE_MAX_TOKENS):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.max_tokens = max_tokens
+        self._snapshots = OrderedDict()
+        self._etags = OrderedDict()
+        self._refresh_locks = {}
+        # Atualizações em andamento pedidas pelo event loop (get_async), por token
+        self._inflight = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def _cached(self, token):
+        with self._lock:
+            snapshot = self._snapshots.get(token)
+            if snapshot is not None:
+                self._snapshots.move_to_end(token)
+            return snapshot
+
+    def get(self, token=TOKEN):
+        snapshot = self._cached(token)
+        if snapshot is None or snapshot.age() >= self.max_stale:
+            return self._refresh_once(token, snapshot) or snapshot
+        if snapshot.age() >= self.ttl:
+            self._refresh_in_background(token)
+        return snapshot
+
+    async def get_async(self, token=TOKEN):
+        """ Como get, mas a atualização bloqueante roda em uma thread, fora do event loop. """
+        snapshot = self._cached(token)
+        if snapshot is None or snapshot.age() >= self.max_stale:
+            # As requisições que chegam durante a atualização esperam a mesma tarefa, sem ocupar threads
+            task = self._inflight.get(token)
+            if task is None:
+                task = asyncio.ensure_future(asyncio.to_thread(self._refresh_once, token, snapshot))
+                self._inflight[token] = task
+                task.add_done_callback(lambda _: self._inflight.pop(token, None))
+            return await asyncio.shield(task) or snapshot
+        if snapshot.age() >= self.ttl:
+            self._refresh_in_background(token)
+        return snapshot
+
+    def _refresh_once(self, token, previous):
+        """ Atualiza o snapshot, a menos que outra chamada já o tenha trocado por um novo enquanto esta esperava. """
+        with self._lock:
+            lock = self._refresh_locks.setdefault(token, threading.Lock())
+        with lock:
+            current = self._cached(token)
+            if current is not None and current is not previous and current.age() < self.max_stale:
+                return current
+            return self.refresh(token)
+
+    def refresh(self, token=TOKEN):
+        """ Busca o snapshot no Canvas. Retorna None (mantendo o anterior) se os cursos não puderem ser obtidos. """
+        with self._lock:
+            etags = self._etags.setdefault(token, {})
+        req = Request(token=token, etags=etags)
+        courses = req.get_courses()
+        if not isinstance(courses, list):
+            logger.error("Falha ao atualizar o snapshot do Canvas: cursos indisponíveis")
+            return None
+        snapshot = Snapshot(
+            courses=courses,
+            modules=req.get_all_modules(courses),
+            calendar=req.get_calendar(),
+            username=req.get_username(),
+        )
+        with self._lock:
+            self._snapshots[token] = snapshot
+            self._snapshots.move_to_end(token)
+            self._etags[token] = etags
+            self._etags.move_to_end(token)
+            while len(self._snapshots) > self.max_tokens:
+                evicted, _ = self._snapshots.popitem(last=False)
+                self._forget(evicted)
+            while len(self._etags) > self.max_tokens:
+                self._forget(next(iter(self._etags)))
+        return snapshot
+
+    def _forget(self, token):
+        self._snapshots.pop(token, None)
+        self._etags.pop(token, None)
+        self._refresh_locks.pop(token, None)
+
+    def invalidate(self, token=None):
+        """ Descarta o snapshot e os ETags de um token (ou de todos). """
+        with self._lock:
+            if token is None:
+                self._snapshots.clear()
+                self._etags.clear()
+                self._refresh_locks.clear()
+            else:
+                self._forget(token)
+
+    def _refresh_in_background(self, token):
+        with self._lock:
+            if token in self._refreshing:
+                return
+            self._refreshing.add(token)
+        threading.Thread(target=self._background_refresh, args=(token,), daemon=True).start()
+
+    def _background_refresh(self, token):
+        try:
+            self._refresh_once(token, self._cached(token))
+        except Exception as e:
+            logger.error(f"Erro ao atualizar o snapshot do Canvas: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(token)
+
+class CachedRequest(Request):
+    """ Request que responde cursos, módulos, calendário (e seu índice) e usuário a partir de um Snapshot. """
+
+    def __init__(self, snapshot, token=TOKEN):
+        super().__init__(token=token)
+        self.snapshot = snapshot
+
+    def get_courses(self):
+        return self.snapshot.courses
+
+    def get_all_modules(self, courses):
+        return self.snapshot.modules
+
+    def get_calendar(self):
+        return self.snapshot.calendar
+
+    def get_calendar_index(self):
+        return self.snapshot.calendar_index
+
+    def get_username(self):
+        return self.snapshot.username
+
+cache = SnapshotCache()
+
+def request(token=TOKEN):
+    """ Retorna um Request servido pelo cache; se não houver snapshot, usa o Canvas diretamente. """
+    snapshot = cache.get(token)
+    return CachedRequest(snapshot, token) if snapshot else Request(token=token)
+
+async def request_async(token=TOKEN):
+    """ request() para o event loop: a atualização do snapshot, se necessária, roda em uma thread. """
+    snapshot = await cache.get_async(token)
+    return CachedRequest(snapshot, token) if snapshot else Request(token=token)
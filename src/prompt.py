@@ -0,0 +1,67 @@
+import os
+import re
+
+from tokenizer import fold
+
+# Orçamento (em tokens estimados) para a lista de cursos e módulos do prompt de sistema
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1500"))
+
+# Palavras sem valor para decidir relevância (já sem acentos)
+STOPWORDS = {
+    "a", "o", "as", "os", "um", "uma", "uns", "umas", "de", "da", "do", "das", "dos", "e", "em",
+    "no", "na", "nos", "nas", "para", "pra", "por", "com", "sem", "que", "qual", "quais", "quando",
+    "onde", "como", "meu", "meus", "minha", "minhas", "sobre", "me", "eu", "voce", "tem", "ter",
+    "sao", "ser", "esta", "isso", "este", "esse", "ao", "aos", "mais", "curso", "cursos",
+    "modulo", "modulos", "materia", "materias", "disciplina", "disciplinas",
+}
+
+def terms(text, stem=6):
+    """ Termos relevantes do texto, truncados em stem caracteres para aproximar flexões. """
+    return {word[:stem] for word in re.findall(r"\w+", fold(text)) if len(word) > 2 and word not in STOPWORDS}
+
+def estimate_tokens(text):
+    """ Estimativa de tokens (~4 caracteres por token), suficiente para aplicar o orçamento. """
+    return (len(text) + 3) // 4
+
+def course_line(course):
+    return f"- {course['name']}"
+
+def module_line(module):
+    return f"- {module['name']} (Curso: {module['course_name']})"
+
+def select_context(courses, modules, user_message, token_budget=PROMPT_TOKEN_BUDGET):
+    """
+    Seleciona os cursos e módulos que cabem no orçamento de tokens, dos mais aos menos
+    relevantes para a mensagem do usuário.
+
+    A relevância é o número de termos da mensagem presentes no nome do item; um módulo
+    herda metade da pontuação do seu curso. Itens sem relação com a mensagem ainda entram
+    se sobrar orçamento, então contas pequenas continuam vendo tudo.
+
+    Returns:
+        tuple: (cursos, módulos) selecionados, na ordem original.
+    """
+    query = terms(user_message or "")
+    course_scores = {course["name"]: len(query & terms(course["name"])) for course in courses}
+
+    candidates = [(course_scores[course["name"]], course_line(course), 0, index) for index, course in enumerate(courses)]
+    candidates += [
+        (len(query & terms(module["name"])) + course_scores.get(module["course_name"], 0) / 2, module_line(module), 1, index)
+        for index, module in enumerate(modules)
+    ]
+    # Maior pontuação primeiro; no empate, cursos antes de módulos e a ordem original
+    candidates.sort(key=lambda candidate: (-candidate[0], candidate[2], candidate[3]))
+
+    used = 0
+    selected = (set(), set())
+    for _, line, kind, index in candidates:
+        cost = estimate_tokens(line) + 1
+        if used + cost > token_budget:
+            continue
+        used += cost
+        selected[kind].add(index)
+
+    return (
+        [course for index, course in enumerate(courses) if index in selected[0]],
+        [module for index, module in enumerate(modules) if index in selected[1]],
+    )
@@ -1,21 +1,231 @@
 import sqlite3
+import asyncio
+import logging
+import queue
+import threading
+import time
+import atexit
+from datetime import datetime
 from dotenv import load_dotenv
 import os
 
+import database
+
 load_dotenv()
 
 DB_HOST = os.getenv("DB_HOST")
+DB_PORT = int(os.getenv("DB_PORT", "5432"))
+DB_USER = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_NAME = os.getenv("DB_NAME")
+# "sqlite" (DB_HOST é o arquivo do banco) ou "postgres"
+DB_ENGINE = os.getenv("DB_ENGINE", "sqlite")
+WRITE_BATCH_SIZE = int(os.getenv("CHAT_HISTORY_BATCH_SIZE", "100"))
+WRITE_FLUSH_INTERVAL = float(os.getenv("CHAT_HISTORY_FLUSH_INTERVAL", "0.5"))
+WRITE_QUEUE_SIZE = int(os.getenv("CHAT_HISTORY_QUEUE_SIZE", "10000"))
 
-def Insert_chat_history(username: str, message: str, chat_response: str, date: str):
+logger = logging.getLogger(__name__)
+
+_pool = None
+_sync_pool = None
+_writer = None
+_pending = set()
+
+class ChatHistoryWriter:
+    """
+    Escrita em segundo plano (write-behind) do histórico no SQLite.
+
+    Uma thread mantém uma única conexão em modo WAL e grava as mensagens da fila em
+    lotes: o commit acontece quando o lote atinge batch_size ou quando flush_interval
+    segundos se passam desde a primeira mensagem pendente.
+
+    Args:
+        path (str): Caminho do banco SQLite.
+        batch_size (int): Máximo de mensagens por commit.
+        flush_interval (float): Tempo máximo (s) que uma mensagem espera pelo commit.
+        max_queue (int): Tamanho máximo da fila; quando cheia, put bloqueia.
+    """
+
+    _STOP = object()
+    _INSERT = "INSERT INTO chat_history (username, message, chat_response, date) VALUES (?, ?, ?, ?)"
+
+    def __init__(self, path, batch_size=WRITE_BATCH_SIZE, flush_interval=WRITE_FLUSH_INTERVAL, max_queue=WRITE_QUEUE_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="chat-history-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, row, block=True):
+        """
+        Enfileira (username, message, chat_response, date). Levanta queue.Full se block=False e a
+        fila estiver cheia, e RuntimeError se a thread de escrita não estiver mais rodando.
+        """
+        while True:
+            if not self._thread.is_alive():
+                raise RuntimeError("A thread de gravação do histórico não está rodando")
+            try:
+                # Com timeout, uma fila cheia cuja thread morreu não bloqueia para sempre
+                self.queue.put(row, block=block, timeout=1 if block else None)
+                return
+            except queue.Full:
+                if not block:
+                    raise
+
+    def close(self, timeout=None):
+        """ Grava tudo o que estiver na fila e encerra a thread. """
+        if self._thread.is_alive():
+            self.queue.put(self._STOP)
+            self._thread.join(timeout)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _run(self):
+        conn = None
+        stopping = False
+        try:
+            while not stopping:
+                row = self.queue.get()
+                if row is self._STOP:
+                    break
+                batch = [row]
+                deadline = time.monotonic() + self.flush_interval
+                while len(batch) < self.batch_size:
+                    try:
+                        row = self.queue.get(timeout=max(deadline - time.monotonic(), 0))
+                    except queue.Empty:
+                        break
+                    if row is self._STOP:
+                        stopping = True
+                        break
+                    batch.append(row)
+                # Nenhum erro encerra a thread: sem ela, ninguém mais esvaziaria a fila
+                try:
+                    if conn is None:
+                        conn = self._connect()
+                    self._write(conn, batch)
+                except Exception as e:
+                    logger.error(f"Erro ao gravar {len(batch)} mensagens no banco: {str(e)}")
+                    if conn is not None:
+                        conn.close()
+                    conn = None
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _write(self, conn, batch):
+        try:
+            with conn:
+                conn.executemany(self._INSERT, batch)
+            return
+        except sqlite3.OperationalError:
+            # Banco inacessível (travado, disco cheio, sem a tabela): gravar linha a linha também falharia
+            raise
+        except Exception as e:
+            if len(batch) > 1:
+                logger.warning(f"Lote de {len(batch)} mensagens rejeitado ({str(e)}); gravando uma a uma")
+        # Uma linha inválida não descarta as demais do lote
+        for row in batch:
+            try:
+                with conn:
+                    conn.execute(self._INSERT, row)
+            except sqlite3.OperationalError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro ao gravar mensagem no banco: {str(e)}")
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        _writer = ChatHistoryWriter(DB_HOST)
+        atexit.register(_writer.close)
+    return _writer
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        _pool = database.AsyncPool(
+            setup=database.CHAT_HISTORY_SCHEMA,
+            address=(DB_HOST, DB_PORT),
+            user=DB_USER,
+            password=DB_PASSWORD,
+            database=DB_NAME,
+        )
+    return _pool
+
+def get_sync_pool():
+    """ Pool síncrono, para gravações feitas fora de um event loop. """
+    global _sync_pool
+    if _sync_pool is None:
+        _sync_pool = database.Pool(
+            setup=database.CHAT_HISTORY_SCHEMA,
+            address=(DB_HOST, DB_PORT),
+            user=DB_USER,
+            password=DB_PASSWORD,
+            database=DB_NAME,
+        )
+        atexit.register(_sync_pool.close)
+    return _sync_pool
+
+async def insert_chat_history_async(username: str, message: str, chat_response: str, date: str):
+    """
+    Grava uma mensagem sem bloquear o event loop.
+
+    No PostgreSQL usa o driver assíncrono com pool de conexões; no SQLite a mensagem
+    vai para a fila do ChatHistoryWriter.
+    """
+    if DB_ENGINE != "postgres":
+        row = (username, message, chat_response, date)
+        try:
+            get_writer().put(row, block=False)
+        except queue.Full:
+            await asyncio.to_thread(get_writer().put, row)
+        return
     try:
-        conn = sqlite3.connect(DB_HOST)
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO chat_history (username, message, chat_response, date) VALUES (?, ?, ?, ?)", (username, message, chat_response, date))
-        conn.commit()
-    except sqlite3.Error as e:
-        raise Exception(f"Database error: {str(e)}")
+        async with get_pool().connection() as db:
+            insert = await db.prepare(database.INSERT_CHAT_HISTORY)
+            await insert(username, message, chat_response, datetime.strptime(date, "%d/%m/%Y %H:%M:%S"))
     except Exception as e:
-        raise Exception(f"Error inserting document: {str(e)}")
-    finally:
-        if 'conn' in locals():
-            conn.close()
\ No newline at end of file
+        raise Exception(f"Database error: {str(e)}")
+
+def _log_failure(task):
+    _pending.discard(task)
+    if not task.cancelled() and task.exception():
+        logger.error(f"Erro ao inserir mensagem no banco: {str(task.exception())}")
+
+def Insert_chat_history(username: str, message: str, chat_response: str, date: str):
+    if DB_ENGINE == "postgres":
+        # Chamado de código síncrono dentro do event loop: agenda a escrita em vez de esperar por ela
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Sem event loop: as conexões do AsyncPool ficariam presas a um loop temporário
+            try:
+                with get_sync_pool().connection() as db:
+                    db.prepare(database.INSERT_CHAT_HISTORY)(
+                        username, message, chat_response, datetime.strptime(date, "%d/%m/%Y %H:%M:%S")
+                    )
+            except Exception as e:
+                raise Exception(f"Database error: {str(e)}")
+            return
+        task = loop.create_task(insert_chat_history_async(username, message, chat_response, date))
+        _pending.add(task)
+        task.add_done_callback(_log_failure)
+        return
+    get_writer().put((username, message, chat_response, date))
+
+async def close():
+    """ Aguarda as escritas pendentes, esvazia a fila do SQLite e fecha os pools de conexões. """
+    if _pending:
+        await asyncio.gather(*_pending, return_exceptions=True)
+    if _writer is not None:
+        await asyncio.to_thread(_writer.close)
+    if _pool is not None:
+        await _pool.close()
+    if _sync_pool is not None:
+        _sync_pool.close()
@@ -1,6 +1,11 @@
 from fastapi import APIRouter, Request, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from contextlib import aclosing
 from datetime import datetime
+import asyncio
+import threading
+import time
 import os
 from dotenv import load_dotenv
 from openai import OpenAI
@@ -10,11 +15,16 @@ import json
 from schemas import Chat
 from query import chats
 from utils import *
+import canvas_cache
+import semantic_cache
+import retrieval
 
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 client = OpenAI(api_key=OPENAI_API_KEY)
+# Respostas do chatbot por similaridade da pergunta, válidas enquanto o snapshot do Canvas e o corpus não mudarem
+answer_cache = semantic_cache.SemanticCache(semantic_cache.openai_embedder(client))
 
 logger = logging.getLogger(__name__)
 
@@ -37,8 +47,9 @@ async def chat(chat_data: Chat.chat_):
         - Status code: 204 (Nenhum conteúdo)
         - Status code: 500 (Erro interno do servidor)
     """
-    req = Request()
     try:
+        # Cursos, módulos, calendário e usuário vêm do snapshot em cache (sem chamadas ao Canvas enquanto válido)
+        req = await canvas_cache.request_async()
         courses = req.get_courses()
         all_modules = req.get_all_modules(courses)
         current_datetime = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
@@ -46,22 +57,195 @@ async def chat(chat_data: Chat.chat_):
         username_logged = req.get_username()
 
         if courses or all_modules:
-            initial_prompt = prepare_initial_prompt(courses, all_modules)
-            chat_history = [{"role": "system", "content": initial_prompt}]
+            chat_history = system_messages(courses, all_modules, user_message)
             
             # Processar mensagem do usuário
             response, status_code = req.handle_user_message(user_message, courses, all_modules)
             if response:
                 return JSONResponse(content=response, status_code=status_code)
 
-            # Resposta do chatbot
-            response, status_code = req.get_chatbot_response(client, user_message, chat_history)
+            # Resposta do chatbot (do cache semântico, se a pergunta já foi respondida com este snapshot)
+            version = _cache_version(req)
+            cached, vector = await _cache_lookup(user_message, version)
+            if cached:
+                response, status_code = cached, 200
+            else:
+                response, status_code = req.get_chatbot_response(client, user_message, chat_history)
+                if response and version:
+                    await run_in_threadpool(answer_cache.store, user_message, response, TOKEN, version, vector)
             if response:
-                chats.Insert_chat_history(username=json.dumps(username_logged), message=json.dumps(user_message), chat_response=json.dumps(response), date=current_datetime)
+                await _save_history(username_logged, user_message, response, current_datetime)
             return JSONResponse(content=response, status_code=status_code)
         else:
             logger.info("Nenhum curso encontrado")
             return JSONResponse(content={"not found": "Nenhum curso encontrado"}, status_code=204)
     except Exception as e:
         logger.error(f"Erro: {str(e)}")
-        return JSONResponse(content={"error": f"Erro interno: {str(e)}"}, status_code=500)
\ No newline at end of file
+        return JSONResponse(content={"error": f"Erro interno: {str(e)}"}, status_code=500)
+
+@router.get("/cache")
+async def cache_stats():
+    """ Métricas do cache semântico de respostas (entradas, acertos, taxa de acerto, remoções). """
+    return JSONResponse(content=answer_cache.stats(), status_code=200)
+
+def _cache_version(req):
+    """ Versão do contexto da resposta (snapshot do Canvas + corpus institucional); None sem snapshot. """
+    snapshot = getattr(req, "snapshot", None)
+    return f"{snapshot.version}:{retrieval.get_index().version}" if snapshot else None
+
+async def _cache_lookup(user_message, version):
+    """ Consulta o cache semântico fora do event loop. Retorna (resposta, embedding). """
+    if not version:
+        return None, None
+    return await run_in_threadpool(answer_cache.lookup, user_message, TOKEN, version)
+
+async def _save_history(username, user_message, response, current_datetime):
+    """ Grava a interação no histórico. Uma falha do banco é registrada sem afetar a resposta já obtida. """
+    try:
+        await chats.insert_chat_history_async(username=json.dumps(username), message=json.dumps(user_message), chat_response=json.dumps(response), date=current_datetime)
+    except Exception as e:
+        logger.error(f"Erro ao inserir mensagem no banco: {str(e)}")
+
+async def _after_stream(username, user_message, response, current_datetime, version, vector):
+    """ Guarda a resposta transmitida no cache semântico e no histórico. """
+    if version:
+        await run_in_threadpool(answer_cache.store, user_message, response, TOKEN, version, vector)
+    await _save_history(username, user_message, response, current_datetime)
+
+def _sse(data, event=None):
+    """ Formata um evento Server-Sent Events com dados em JSON. """
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def _iterate_in_thread(iterator):
+    """
+    Consome um iterador síncrono (o stream da OpenAI) em uma thread dedicada e repassa os itens
+    ao event loop.
+
+    Quando o consumidor para (fim, erro ou desconexão do cliente), a thread é sinalizada e fecha
+    o iterador ela mesma, depois do next() em andamento: um gerador não pode ser fechado por
+    outra thread enquanto executa, e o stream da OpenAI ficaria aberto.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def put(kind, value=None):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, (kind, value))
+        except RuntimeError:
+            # Event loop já encerrado: não há mais quem consuma
+            pass
+
+    def run():
+        try:
+            for item in iterator:
+                if stop.is_set():
+                    break
+                put("item", item)
+            put("done")
+        except Exception as e:
+            put("error", e)
+        finally:
+            if hasattr(iterator, "close"):
+                iterator.close()
+
+    threading.Thread(target=run, name="chat-stream", daemon=True).start()
+    try:
+        while True:
+            kind, value = await queue.get()
+            if kind == "done":
+                return
+            if kind == "error":
+                raise value
+            yield value
+    finally:
+        stop.set()
+
+async def _stream_events(deltas, started_at, username, user_message, current_datetime, version=None, vector=None):
+    """
+    Repassa os trechos da resposta como eventos SSE e grava o histórico depois do evento done.
+
+    Eventos:
+    - (padrão) {"delta": str}: trecho da resposta.
+    - done {"message": str, "ttft_ms": float, "total_ms": float}: resposta completa e latências.
+    - error {"error": str}: falha durante a geração.
+    """
+    parts = []
+    ttft_ms = None
+    try:
+        # O cliente OpenAI é síncrono: o stream é lido em uma thread para não bloquear o event loop
+        async with aclosing(_iterate_in_thread(deltas)) as events:
+            async for delta in events:
+                if ttft_ms is None:
+                    ttft_ms = (time.perf_counter() - started_at) * 1000
+                    logger.info(f"Tempo até o primeiro token: {ttft_ms:.0f} ms")
+                parts.append(delta)
+                yield _sse({"delta": delta})
+    except Exception as e:
+        logger.error(f"Erro: {str(e)}")
+        yield _sse({"error": f"Erro interno: {str(e)}"}, event="error")
+        return
+
+    message = "".join(parts)
+    total_ms = (time.perf_counter() - started_at) * 1000
+    logger.info(f"Resposta transmitida em {total_ms:.0f} ms")
+    yield _sse({"message": message, "ttft_ms": ttft_ms, "total_ms": total_ms}, event="done")
+    # O cliente já tem a resposta completa: o cache e o banco não atrasam nem derrubam o stream, e o
+    # shield mantém a gravação se o cliente desconectar logo depois do done
+    await asyncio.shield(_after_stream(username, user_message, {"message": message}, current_datetime, version, vector))
+
+@router.post("/stream")
+async def chat_stream(chat_data: Chat.chat_):
+    """
+    Versão em streaming do endpoint /chat: a resposta do chatbot é enviada como
+    Server-Sent Events à medida que é gerada.
+
+    Input:
+    - chat_data: 
+        - Dados da interação do usuário com o chatbot.
+    
+    Output:
+    
+    * Sucesso:
+        - text/event-stream com eventos {"delta"} e um evento final "done". Status code: 200
+        - Comandos ("módulos do curso", "aulas no calendário") respondem em JSON, como em /chat.
+    * Erro:
+        - Status code: 204 (Nenhum conteúdo)
+        - Status code: 500 (Erro interno do servidor)
+        - Evento "error", se a falha ocorrer depois do início do stream.
+    """
+    started_at = time.perf_counter()
+    try:
+        req = await canvas_cache.request_async()
+        courses = req.get_courses()
+        all_modules = req.get_all_modules(courses)
+        current_datetime = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+        user_message = chat_data.user_message
+        username_logged = req.get_username()
+
+        if not (courses or all_modules):
+            logger.info("Nenhum curso encontrado")
+            return JSONResponse(content={"not found": "Nenhum curso encontrado"}, status_code=204)
+
+        response, status_code = req.handle_user_message(user_message, courses, all_modules)
+        if response:
+            return JSONResponse(content=response, status_code=status_code)
+
+        version = _cache_version(req)
+        cached, vector = await _cache_lookup(user_message, version)
+        if cached:
+            # Resposta do cache semântico: enviada em um único evento; não é gravada de novo no cache
+            deltas, version = iter([cached["message"]]), None
+        else:
+            chat_history = system_messages(courses, all_modules, user_message)
+            deltas = stream_with_chatbot(client, user_message, chat_history)
+        return StreamingResponse(
+            _stream_events(deltas, started_at, username_logged, user_message, current_datetime, version, vector),
+            media_type="text/event-stream",
+            # Evita que proxies (ex.: nginx) acumulem a resposta antes de repassá-la
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    except Exception as e:
+        logger.error(f"Erro: {str(e)}")
+        return JSONResponse(content={"error": f"Erro interno: {str(e)}"}, status_code=500)
@@ -7,12 +7,19 @@ import os
 from dotenv import load_dotenv
 
 from query import chats
+import canvas_client
+import calendar_index
+import calendar_sync
+import prompt
+import retrieval
 
 load_dotenv()
 
 TOKEN = os.getenv("TOKEN_CANVAS")
 canvas_api_url = os.getenv("CANVAS_API_URL")
 headers = {"Authorization": f"Bearer {TOKEN}"}
+# Máximo aceito pelo Canvas; as demais páginas são seguidas pelo cabeçalho Link
+PER_PAGE = 100
 
 logger = logging.getLogger(__name__)
 
@@ -54,28 +61,65 @@ def parse_date_friendly(date_string):
         return None
 
 class Request:
-    def __init__(self):
+    def __init__(self, token=TOKEN, etags=None):
         self.params = None
         self.course_id = None
         self.module_id = None
+        self.headers = {"Authorization": f"Bearer {token}"}
+        # Cache opcional {(url, params): (etag, dados, próxima página)} para requisições condicionais
+        self.etags = etags
 
-    def make_request(self, endpoint, params=None):
-        try:
-            url = f"{canvas_api_url}{endpoint}"
+    def fetch_page(self, url, params=None):
+        """
+        Busca uma página de um endpoint do Canvas.
+
+        Returns:
+            tuple: (dados, URL da próxima página segundo o cabeçalho Link, ou None).
+
+        Raises:
+            requests.exceptions.RequestException, ValueError: Em falhas de rede, HTTP ou JSON.
+        """
+        key = (url, tuple(sorted((params or {}).items())))
+        cached = self.etags.get(key) if self.etags is not None else None
+
+        request_headers = dict(self.headers)
+        if cached:
+            request_headers["If-None-Match"] = cached[0]
 
-            # Add timeout to prevent hanging
-            response = requests.get(
-                url, 
-                headers=headers, 
-                params=params,
-                timeout=30
-            )
+        response = canvas_client.get(url, headers=request_headers, params=params)
 
-            # Raise for bad status codes
-            response.raise_for_status()
+        # Not Modified: reaproveita a resposta anterior (um 304 não traz o cabeçalho Link)
+        if response.status_code == 304 and cached:
+            return cached[1], cached[2]
+
+        # Raise for bad status codes
+        response.raise_for_status()
+
+        data = response.json()
+        next_url = response.links.get("next", {}).get("url")
+        if self.etags is not None and response.headers.get("ETag"):
+            self.etags[key] = (response.headers["ETag"], data, next_url)
+        return data, next_url
+
+    def make_request(self, endpoint, params=None):
+        try:
+            return self.fetch_page(f"{canvas_api_url}{endpoint}", params)[0]
+        except requests.exceptions.RequestException as e:
+            print(f"Request failed: {str(e)}")
+            return None
+        except ValueError as e:  # JSON decode error
+            print(f"Failed to parse response: {str(e)}")
+            return None
 
-            return response.json()
+    def paginate(self, endpoint, params=None):
+        """ Gera todos os itens de um endpoint de listagem, página a página (ver canvas_client.paginate). """
+        params = {"per_page": PER_PAGE, **(params or {})}
+        return canvas_client.paginate(self.fetch_page, f"{canvas_api_url}{endpoint}", params)
 
+    def list_all(self, endpoint, params=None):
+        """ Lista todas as páginas de um endpoint. Retorna None se alguma página falhar. """
+        try:
+            return list(self.paginate(endpoint, params))
         except requests.exceptions.RequestException as e:
             print(f"Request failed: {str(e)}")
             return None
@@ -84,65 +128,59 @@ class Request:
             return None
         
     def get_calendar(self):
-        headers = {
-        "Authorization": f"Bearer {TOKEN}"
-        }
-        response = requests.get(f"{canvas_api_url}/calendar_events?start_date=2025-01-01&end_date=2025-12-31", headers=headers)
-        if response.status_code == 200:
-            user_data = response.json()
-            return user_data
+        # Janela móvel relativa a hoje; com o cache de ETags, páginas sem alteração voltam como 304
+        return self.list_all("/calendar_events", calendar_sync.calendar_params())
         
+    def get_calendar_index(self):
+        # Ocorrências de séries ausentes no período consultado foram removidas no Canvas
+        return calendar_index.CalendarIndex(self.get_calendar(), window=calendar_index.date_window(**calendar_sync.window_params()))
+
     def get_calendar_events(self, title_filter=None, date_filter=None):
         try:
-            events = self.get_calendar()
-
-            # Filtra os eventos pelo título ou pela data, se fornecidos
-            filtered_events = []
-            for event in events:
-                title_matches = title_filter.lower() in event["title"].lower() if title_filter else True
-                date_matches = date_filter in event["start_at"] if date_filter else True
-
-                if title_matches and date_matches:
-                    filtered_events.append(event)
-
-            return filtered_events
-
+            # Filtra os eventos pelo título e/ou pela data (YYYY-MM-DD, no fuso do calendário)
+            return self.get_calendar_index().search(title=title_filter, date=date_filter)
         except Exception as e:
             logger.error(f"Erro ao buscar eventos do calendário: {str(e)}")
             return []
 
+    def get_next_event(self, title_filter=None):
+        try:
+            return self.get_calendar_index().next_event(title=title_filter)
+        except Exception as e:
+            logger.error(f"Erro ao buscar eventos do calendário: {str(e)}")
+            return None
+
     def get_username(self):
-        headers = {
-        "Authorization": f"Bearer {TOKEN}"
-        }
-        response = requests.get(f"{canvas_api_url}/users/self", headers=headers)
-        if response.status_code == 200:
-            user_data = response.json()
-            return user_data.get("name")
+        user_data = self.make_request("/users/self")
+        return user_data.get("name") if user_data else None
 
     def list_courses(self, params=None):
-        return self.make_request("/courses", params)
+        return self.list_all("/courses", params)
 
     def get_course_details(self, course_id, params=None):
         return self.make_request(f"/courses/{course_id}", params)
 
     def list_modules(self, course_id, params=None):
-        return self.make_request(f"/courses/{course_id}/modules", params)
+        return self.list_all(f"/courses/{course_id}/modules", params)
 
     def list_module_items(self, course_id, module_id, params=None):
-        return self.make_request(f"/courses/{course_id}/modules/{module_id}/items", params)
+        return self.list_all(f"/courses/{course_id}/modules/{module_id}/items", params)
     
     def get_courses(self):
         try:
-            return self.list_courses(params={"per_page": 5})
+            return self.list_courses()
         except Exception as e:
             print(f"Error fetching courses: {e}")
             return str(e)
     
     def get_all_modules(self, courses):
         all_modules = []
-        for course in courses:
-            course_modules = self.list_modules(course_id=course["id"], params={"per_page": 5})
+        # Uma requisição por curso, feitas em paralelo; os resultados mantêm a ordem dos cursos
+        results = canvas_client.fetch_all(
+            lambda course: self.list_modules(course_id=course["id"]),
+            courses
+        )
+        for course, course_modules in zip(courses, results):
             if course_modules:
                 for module in course_modules:
                     module["course_name"] = course["name"]
@@ -201,6 +239,29 @@ class Request:
                     date=current_datetime
                 )
                 return {"not found": response}, 204
+        if user_message.lower().startswith(("próxima aula", "proxima aula")):
+            title_filter = user_message[len("próxima aula"):].strip() or None
+            event = self.get_next_event(title_filter=title_filter)
+            if event:
+                response = f"Próxima aula: {event['title']} em {event['start_at']} (local: {event.get('location_name', 'não especificado')})"
+                chats.Insert_chat_history(
+                    username=username_logged,
+                    message=user_message,
+                    chat_response=response,
+                    date=current_datetime
+                )
+                return {"message": response}, 200
+            else:
+                response = "Nenhuma aula futura encontrada no calendário."
+                chats.Insert_chat_history(
+                    username=username_logged,
+                    message=user_message,
+                    chat_response=response,
+                    date=current_datetime
+                )
+                return {"not found": response}, 204
+        # Não é um comando: a mensagem segue para o chatbot
+        return None, None
     
     def get_chatbot_response(self, client, user_message, chat_history):
         response, _ = interact_with_chatbot(client=client, user_message=user_message, chat_history=chat_history)
@@ -208,9 +269,31 @@ class Request:
         return {"message": response}, 200
 
 # Função para criar um contexto inicial com a lista de cursos
-def prepare_initial_prompt(courses, modules):
-    course_list = "\n".join([f"- {course['name']}" for course in courses])
-    modules_list = "\n".join([f"- {module['name']} (Curso: {module['course_name']})" for module in modules])
+def prepare_initial_prompt(courses, modules, user_message=None, token_budget=prompt.PROMPT_TOKEN_BUDGET):
+    """
+    Monta o prompt de sistema com os cursos e módulos do Canvas.
+
+    Com user_message, inclui apenas os cursos e módulos mais relevantes para a mensagem que
+    cabem em token_budget (ver prompt.select_context) e registra quantos tokens foram economizados.
+    Sem user_message, inclui todos.
+    """
+    if user_message is None:
+        return render_initial_prompt(courses, modules)
+
+    selected_courses, selected_modules = prompt.select_context(courses, modules, user_message, token_budget)
+    initial_prompt = render_initial_prompt(selected_courses, selected_modules)
+
+    full_tokens = prompt.estimate_tokens(render_initial_prompt(courses, modules))
+    prompt_tokens = prompt.estimate_tokens(initial_prompt)
+    logger.info(
+        f"Prompt de sistema: ~{prompt_tokens} tokens, ~{full_tokens - prompt_tokens} economizados "
+        f"({len(selected_courses)}/{len(courses)} cursos, {len(selected_modules)}/{len(modules)} módulos)"
+    )
+    return initial_prompt
+
+def render_initial_prompt(courses, modules):
+    course_list = "\n".join([prompt.course_line(course) for course in courses])
+    modules_list = "\n".join([prompt.module_line(module) for module in modules])
 
     return f"""
         Você é um assistente que ajuda estudantes a entenderem e gerenciarem seus cursos no Canvas LMS.
@@ -224,6 +307,43 @@ def prepare_initial_prompt(courses, modules):
         Como posso ajudá-lo hoje?
     """
 
+def institutional_context(user_message, k=retrieval.CONTEXT_K, min_score=retrieval.MIN_SCORE, token_budget=None):
+    """
+    Mensagem de sistema com os trechos dos documentos institucionais (scraping/) mais
+    relevantes para a mensagem, via busca BM25 local, limitados a token_budget tokens.
+    Retorna None se nenhum for relevante.
+    """
+    results = retrieval.search(user_message, k)
+    if not results or results[0][0] < min_score:
+        return None
+    header = (
+        "Trechos dos documentos institucionais da Facens que podem ajudar a responder. "
+        "Use-os apenas se forem relevantes para a pergunta:\n\n"
+    )
+    used = prompt.estimate_tokens(header)
+    selected = []
+    for score, chunk in results:
+        cost = prompt.estimate_tokens(retrieval.format_context([(score, chunk)])) + 1
+        if score < results[0][0] * retrieval.MIN_RELATIVE_SCORE or (token_budget is not None and used + cost > token_budget):
+            break
+        used += cost
+        selected.append((score, chunk))
+    if not selected:
+        return None
+    return {"role": "system", "content": header + retrieval.format_context(selected)}
+
+def system_messages(courses, modules, user_message, token_budget=prompt.PROMPT_TOKEN_BUDGET):
+    """
+    Mensagens de sistema da conversa dentro de um único orçamento de tokens: os trechos
+    institucionais relevantes usam no máximo metade dele e os cursos e módulos, o restante.
+    """
+    context = institutional_context(user_message, token_budget=token_budget // 2)
+    used = prompt.estimate_tokens(context["content"]) if context else 0
+    messages = [{"role": "system", "content": prepare_initial_prompt(courses, modules, user_message, token_budget - used)}]
+    if context:
+        messages.append(context)
+    return messages
+
 def interact_with_chatbot(client, user_message, chat_history):
     # Adicionar mensagem do usuário ao histórico
     chat_history.append({"role": "user", "content": user_message})
@@ -240,4 +360,30 @@ def interact_with_chatbot(client, user_message, chat_history):
     # Adicionar a resposta ao histórico
     chat_history.append({"role": "assistant", "content": assistant_message})
 
-    return assistant_message, chat_history
\ No newline at end of file
+    return assistant_message, chat_history
+
+def stream_with_chatbot(client, user_message, chat_history):
+    """
+    Versão em streaming de interact_with_chatbot: gera os trechos da resposta à medida que
+    chegam da OpenAI. A resposta completa é adicionada ao histórico ao final do stream.
+    """
+    chat_history.append({"role": "user", "content": user_message})
+
+    stream = client.chat.completions.create(
+        model="gpt-4",
+        messages=chat_history,
+        stream=True,
+    )
+
+    parts = []
+    try:
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                yield delta
+    finally:
+        # Libera a conexão HTTP mesmo se o cliente desconectar no meio do stream
+        stream.close()
+
+    chat_history.append({"role": "assistant", "content": "".join(parts)})
@@ -0,0 +1,36 @@
+"""
+Limpeza de uma página baixada de novo, sozinha, contra o corpus gravado (já limpo).
+
+tests/data/main_page_raw.txt é a página inicial como o scraping original a extraiu, com o
+menu e o rodapé do site.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import boilerplate
+
+SCRAPING = os.path.join(ROOT, "scraping")
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+def test_raw_page_cleaned_with_saved_boilerplate():
+    raw = read(os.path.join(ROOT, "tests", "data", "main_page_raw.txt"))
+    known = boilerplate.load_boilerplate(SCRAPING)
+    assert known
+
+    cleaned, _ = boilerplate.clean_documents({"main_page.txt": raw}, known, total=17)
+
+    assert cleaned["main_page.txt"] == read(os.path.join(SCRAPING, "main_page.txt"))
+    assert len(cleaned["main_page.txt"]) < len(raw) / 2
+
+def test_single_page_is_not_its_own_reference():
+    # Sem o boilerplate salvo, uma página sozinha não tem com o que ser comparada
+    raw = read(os.path.join(ROOT, "tests", "data", "main_page_raw.txt"))
+    cleaned, learned = boilerplate.clean_documents({"main_page.txt": raw}, total=17)
+    assert not learned
+    assert len(cleaned["main_page.txt"]) > len(read(os.path.join(SCRAPING, "main_page.txt")))
@@ -0,0 +1,48 @@
+"""
+Decodificadores do formato binário de resultados e leitura do socket do pgsql (package/pgsql.py).
+"""
+import os
+import sys
+from socket import socketpair
+from struct import pack
+from datetime import date, datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "package"))
+
+import pytest
+
+import pgsql
+
+def decode(oid, data):
+    return pgsql.binary_types[oid](memoryview(data))
+
+def test_date():
+    assert decode(1082, pack("!i", 0)) == date(2000, 1, 1)
+    assert decode(1082, pack("!i", -1)) == date(1999, 12, 31)
+
+def test_date_infinity():
+    # PostgreSQL envia infinity como INT32_MAX e -infinity como INT32_MIN
+    assert decode(1082, pack("!i", 0x7fffffff)) == date.max
+    assert decode(1082, pack("!i", -0x80000000)) == date.min
+
+def test_timestamp_infinity():
+    assert decode(1114, pack("!q", 0x7fffffffffffffff)) == datetime.max
+    assert decode(1114, pack("!q", -0x8000000000000000)) == datetime.min
+    assert decode(1184, pack("!q", 0)) == datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+def test_date_array_with_infinity():
+    elements = [pack("!i", 0x7fffffff), pack("!i", -0x80000000)]
+    data = pack("!iiiii", 1, 0, 1082, 2, 1) + b"".join(pack("!i", len(e)) + e for e in elements)
+    assert decode(1182, data) == [date.max, date.min]
+
+def test_receive_raises_on_eof():
+    # Conexão derrubada pelo servidor: o recv vazio não pode virar um laço infinito
+    local, remote = socketpair()
+    conn = object.__new__(pgsql.Connection)
+    conn._sock = local
+    remote.sendall(b"Z\x00\x00")
+    remote.close()
+    with pytest.raises(EOFError):
+        conn._receive(5)
+    local.close()
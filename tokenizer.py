@@ -0,0 +1,36 @@
+"""
+Normalização e tokenização de textos em português, sem dependências externas: usada pela busca
+BM25 (retrieval.py), pelo índice de títulos do calendário (calendar_index.py), pela seleção de
+cursos e módulos do prompt (src/prompt.py) e pelo cache semântico.
+"""
+import re
+import unicodedata
+
+# Palavras funcionais do português (já sem acentos)
+STOPWORDS = set("""
+a ao aos as ate com como da das de dela dele deles do dos e ela elas ele eles em entre era essa
+esse esta estao estar este eu foi for ha isso isto ja la lhe mais mas me mesmo meu minha muito
+na nao nas nem no nos nossa nosso num numa o os ou para pela pelas pelo pelos por pra qual quais
+quando que quem se seja sem ser seu sua suas seus so sobre tambem te tem ter teu tua um uma umas
+uns voce voces vos sao pode posso onde
+""".split())
+
+def fold(text):
+    """ Remove acentos e converte para minúsculas ('Rematrícula' -> 'rematricula'). """
+    normalized = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in normalized if not unicodedata.combining(char)).lower()
+
+def stem(word):
+    """ Reduz plurais comuns do português ao singular ('informacoes' -> 'informacao', 'digitais' -> 'digital'). """
+    if len(word) <= 3:
+        return word
+    for suffix, replacement in (("coes", "cao"), ("oes", "ao"), ("aes", "ao"), ("ais", "al"), ("eis", "el"), ("ns", "m")):
+        if word.endswith(suffix):
+            return word[:-len(suffix)] + replacement
+    if word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+def tokenize(text):
+    """ Termos do texto: sem acentos, sem stopwords e com plurais reduzidos. """
+    return [stem(word) for word in re.findall(r"\w+", fold(text)) if word not in STOPWORDS and len(word) > 1]
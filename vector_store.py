@@ -0,0 +1,264 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+VECTOR_STORE_NAME = "Facens_VectorStore"
+# Identifica os Vector Stores desta instalação (gravado nos metadados e no nome), para que uma
+# instalação nunca sincronize o Vector Store de outra; na Lambda, o padrão é o nome da função
+DEPLOYMENT = os.getenv("VECTOR_STORE_DEPLOYMENT") or os.getenv("AWS_LAMBDA_FUNCTION_NAME")
+# Limites dos metadados de um Vector Store: 16 chaves, valores de até 512 caracteres
+METADATA_VALUE_SIZE = 512
+METADATA_MAX_PARTS = 13
+# Caracteres do sha256 de cada arquivo guardados nos metadados
+METADATA_DIGEST_SIZE = 16
+MANIFEST_PATH = os.getenv(
+    "VECTOR_STORE_MANIFEST",
+    os.path.join(tempfile.gettempdir(), "vector_store_manifest.json"),
+)
+
+# Cache em memória (por processo) e lock para que apenas uma chamada reconstrua o índice
+_resolved = {}
+_lock = threading.Lock()
+
+def file_digest(file_path):
+    """ Calcula o SHA-256 do conteúdo de um arquivo. """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def corpus_hash(digests):
+    """ Calcula um hash do corpus a partir do digest de cada arquivo ({nome: sha256}). """
+    digest = hashlib.sha256()
+    for name in sorted(digests):
+        digest.update(f"{name}:{digests[name]}\n".encode())
+    return digest.hexdigest()
+
+def corpus_version(file_paths):
+    """ Hash do conteúdo atual do corpus (muda sempre que algum arquivo muda). """
+    return corpus_hash({os.path.basename(path): file_digest(path) for path in file_paths})
+
+def load_manifest(path=MANIFEST_PATH):
+    """
+    Lê o manifesto do Vector Store sincronizado.
+
+    Formato: {"vector_store_id": str, "corpus_hash": str, "files": {nome: {"sha256": str, "file_id": str}}}
+    """
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.error(f"Falha ao ler o manifesto '{path}': {str(e)}")
+        return {}
+    return manifest if "files" in manifest else {}
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    """ Grava o manifesto de forma atômica (arquivo temporário + rename). """
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".manifest-")
+        with os.fdopen(fd, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.error(f"Falha ao gravar o manifesto '{path}': {str(e)}")
+
+def vector_store_name(deployment=DEPLOYMENT):
+    return f"{VECTOR_STORE_NAME}-{deployment}" if deployment else VECTOR_STORE_NAME
+
+def find_vector_store(client, content_hash, deployment=DEPLOYMENT):
+    """
+    Procura na OpenAI um Vector Store desta instalação já indexado para o hash informado.
+    Retorna o objeto do Vector Store ou None.
+    """
+    for vector_store in client.beta.vector_stores.list(limit=100):
+        metadata = vector_store.metadata or {}
+        if (
+            metadata.get("corpus_hash") == content_hash
+            and metadata.get("deployment") == deployment
+            and vector_store.status == "completed"
+        ):
+            return vector_store
+    return None
+
+def find_deployment_vector_store(client, deployment=DEPLOYMENT):
+    """
+    Vector Store mais recente desta instalação (a listagem vem do mais novo para o mais antigo).
+    Sem chave de instalação, nenhum é reaproveitado: o nome padrão é compartilhado com o
+    file_search.py e com outras instalações.
+    """
+    if not deployment:
+        return None
+    for vector_store in client.beta.vector_stores.list(limit=100):
+        metadata = vector_store.metadata or {}
+        if metadata.get("deployment") == deployment and vector_store.status != "expired":
+            return vector_store
+    return None
+
+def store_metadata(content_hash, files, deployment=DEPLOYMENT):
+    """
+    Metadados do Vector Store: a chave da instalação, o hash do corpus e, de cada arquivo, o
+    sha256 abreviado e o file_id ("nome=digest=file_id,..." repartido em files_0, files_1, ...),
+    para que o estado por arquivo possa ser reconstruído quando o manifesto local se perde.
+    """
+    parts, current = [], ""
+    for name, entry in sorted(files.items()):
+        item = f"{name}={entry['sha256'][:METADATA_DIGEST_SIZE]}={entry['file_id']}"
+        if current and len(current) + 1 + len(item) > METADATA_VALUE_SIZE:
+            parts.append(current)
+            current = item
+        else:
+            current = f"{current},{item}" if current else item
+    if current:
+        parts.append(current)
+    metadata = {"corpus_hash": content_hash}
+    if deployment:
+        metadata["deployment"] = deployment
+    if len(parts) > METADATA_MAX_PARTS:
+        logger.warning(f"{len(files)} arquivos não cabem nos metadados do Vector Store; só o hash do corpus é gravado")
+        return metadata
+    metadata["files_parts"] = str(len(parts))
+    metadata.update({f"files_{i}": part for i, part in enumerate(parts)})
+    return metadata
+
+def restore_files(client, vector_store, digests):
+    """
+    Reconstrói o estado por arquivo de um Vector Store existente a partir dos metadados
+    (nome, digest e file_id de cada arquivo), conferidos com uma única listagem dos arquivos
+    anexados. Arquivos com outro conteúdo ficam sem sha256 e são reenviados; arquivos anexados
+    que os metadados não registram (ex.: de um envio interrompido) são removidos.
+    """
+    metadata = vector_store.metadata or {}
+    recorded = {}
+    for i in range(int(metadata.get("files_parts") or 0)):
+        for item in metadata.get(f"files_{i}", "").split(","):
+            fields = item.rsplit("=", 2)
+            if len(fields) == 3:
+                recorded[fields[2]] = (fields[0], fields[1])
+
+    files = {}
+    for vector_store_file in client.beta.vector_stores.files.list(vector_store_id=vector_store.id, limit=100):
+        if vector_store_file.id not in recorded:
+            delete_file(client, vector_store.id, vector_store_file.id)
+            continue
+        name, recorded_digest = recorded[vector_store_file.id]
+        digest = digests.get(name)
+        same = digest is not None and recorded_digest == digest[:METADATA_DIGEST_SIZE]
+        files[name] = {"sha256": digest if same else None, "file_id": vector_store_file.id}
+    return files
+
+def upload_files(client, vector_store_id, file_paths):
+    """ Envia os arquivos e os anexa ao Vector Store em um único lote. Retorna {nome: file_id}. """
+    uploaded = {}
+    for file_path in file_paths:
+        name = os.path.basename(file_path)
+        with open(file_path, "rb") as stream:
+            uploaded[name] = client.files.create(file=(name, stream), purpose="assistants").id
+
+    file_batch = client.beta.vector_stores.file_batches.create_and_poll(
+        vector_store_id=vector_store_id,
+        file_ids=list(uploaded.values())
+    )
+    if file_batch.status != "completed":
+        logger.error(f"Falha ao indexar arquivos no Vector Store {vector_store_id}: {file_batch.status}")
+        for file_id in uploaded.values():
+            delete_file(client, vector_store_id, file_id)
+        return None
+    return uploaded
+
+def delete_file(client, vector_store_id, file_id):
+    """ Desanexa o arquivo do Vector Store e o remove da conta. """
+    try:
+        client.beta.vector_stores.files.delete(file_id, vector_store_id=vector_store_id)
+    except Exception as e:
+        logger.error(f"Falha ao desanexar o arquivo {file_id}: {str(e)}")
+    try:
+        client.files.delete(file_id)
+    except Exception as e:
+        logger.error(f"Falha ao remover o arquivo {file_id}: {str(e)}")
+
+def sync_vector_store(client, file_paths, manifest_path=MANIFEST_PATH):
+    """
+    Sincroniza o Vector Store com o corpus arquivo a arquivo.
+
+    Envia apenas arquivos novos ou alterados, remove os que deixaram de existir e
+    mantém os demais intactos. Sem o manifesto local, o estado por arquivo é reconstruído do
+    Vector Store desta instalação (ver DEPLOYMENT e restore_files). Retorna o ID do Vector Store
+    ou None em caso de falha.
+    """
+    paths = {os.path.basename(file_path): file_path for file_path in file_paths}
+    digests = {name: file_digest(path) for name, path in paths.items()}
+    content_hash = corpus_hash(digests)
+
+    manifest = load_manifest(manifest_path)
+    vector_store_id = manifest.get("vector_store_id")
+    if vector_store_id and manifest.get("corpus_hash") == content_hash:
+        return vector_store_id
+
+    files = manifest.get("files", {})
+    if not vector_store_id:
+        # Manifesto perdido (container novo): o Vector Store desta instalação é reaproveitado, em
+        # vez de ficar órfão, e só a diferença é enviada
+        vector_store = find_vector_store(client, content_hash) or find_deployment_vector_store(client)
+        if vector_store:
+            vector_store_id = vector_store.id
+            files = restore_files(client, vector_store, digests)
+        else:
+            # Sem o hash do corpus até o fim do envio, mas já com a chave da instalação
+            vector_store_id = client.beta.vector_stores.create(
+                name=vector_store_name(), metadata={"deployment": DEPLOYMENT} if DEPLOYMENT else None
+            ).id
+            files = {}
+
+    changed = [name for name in paths if files.get(name, {}).get("sha256") != digests[name]]
+    removed = [name for name in files if name not in paths]
+    logger.info(
+        f"Sincronizando Vector Store {vector_store_id}: "
+        f"{len(changed)} novos/alterados, {len(removed)} removidos, "
+        f"{len(paths) - len(changed)} inalterados"
+    )
+
+    if changed:
+        uploaded = upload_files(client, vector_store_id, [paths[name] for name in changed])
+        if uploaded is None:
+            return None
+        for name, file_id in uploaded.items():
+            if name in files:
+                delete_file(client, vector_store_id, files[name]["file_id"])
+            files[name] = {"sha256": digests[name], "file_id": file_id}
+
+    for name in removed:
+        delete_file(client, vector_store_id, files.pop(name)["file_id"])
+
+    client.beta.vector_stores.update(vector_store_id, metadata=store_metadata(content_hash, files))
+    save_manifest(
+        {"vector_store_id": vector_store_id, "corpus_hash": content_hash, "files": files},
+        manifest_path
+    )
+    return vector_store_id
+
+def get_or_create_vector_store(client, file_paths, manifest_path=MANIFEST_PATH):
+    """
+    Retorna o ID de um Vector Store com o conteúdo atual do corpus.
+
+    Quando o hash do corpus muda, apenas a diferença é sincronizada (ver sync_vector_store).
+    """
+    content_hash = corpus_version(file_paths)
+    if content_hash in _resolved:
+        return _resolved[content_hash]
+
+    with _lock:
+        if content_hash not in _resolved:
+            vector_store_id = sync_vector_store(client, file_paths, manifest_path)
+            if not vector_store_id:
+                return None
+            _resolved[content_hash] = vector_store_id
+        return _resolved[content_hash]